@@ -0,0 +1,87 @@
+import argparse
+import math
+import numpy as np
+
+from orbitcore.constants import FRAME_MS, FRAME_RATE
+from orbitcore.events import write_midi_file
+from orbitcore.settings import read_scene
+from orbitcore.timeline import (collision_peaks, cycle_length, event_density, export_timeline,
+                                revolution_frames, trigger_timeline)
+
+def analyze(file, duration=None, max_cycle=3600.0, tolerance=1.0, bin_ms=1000.0, collision_ms=10.0,
+            peak_count=10, timeline_file=None, midi_file=None):
+    scene = read_scene(file)
+    bodies, speed_multiplier = scene['bodies'], scene['speed_multiplier']
+    if not bodies:
+        print(f"{file}: no bodies")
+        return
+
+    cycle, drift, exact = cycle_length(bodies, speed_multiplier, tolerance, max_cycle * FRAME_RATE)
+    window = duration * FRAME_RATE if duration else min(cycle, max_cycle * FRAME_RATE)
+
+    triggers = scene['triggers']
+    times, body_indices, line_indices, directions = trigger_timeline(bodies, speed_multiplier, window, triggers)
+    times_ms = times * FRAME_MS
+    window_ms = window * FRAME_MS
+
+    planets = sum(1 for body in bodies if body['parent'] is None)
+    print(f"Scene: {file}")
+    print(f"Bodies: {len(bodies)} ({planets} planets, {len(bodies) - planets} moons), "
+          f"speed multiplier {speed_multiplier}")
+    if exact:
+        print(f"Global cycle: {cycle * FRAME_MS:.1f} ms (exact)")
+    else:
+        print(f"Global cycle: no exact repeat within {max_cycle:.0f} s, "
+              f"best near-repeat at {cycle * FRAME_MS:.1f} ms (max drift {drift:.2f} px)")
+    print(f"Analysed window: {window_ms:.1f} ms, {len(times)} events "
+          f"({len(times) / max(window_ms / 1000, 1e-9):.2f} per second)")
+
+    print("\nPer-body crossing periods:")
+    for index, body in enumerate(bodies):
+        revolution = revolution_frames(body, speed_multiplier) * FRAME_MS
+        events = times_ms[body_indices == index]
+        interval = f"{np.mean(np.diff(events)):.2f} ms" if len(events) > 1 else "n/a"
+        line = (f"  {body['name']:<16} r={body['radius']:<5} f={body['frequency']:<7g} "
+                f"revolution {revolution:.2f} ms, mean interval {interval}, {len(events)} events")
+        if body['parent'] is not None:
+            parent = bodies[body['parent']]
+            pattern = 2 * math.pi * math.lcm(parent['radius'], body['radius']) / speed_multiplier * FRAME_MS
+            line += f", pattern repeats every {pattern:.2f} ms"
+        print(line)
+
+    counts = event_density(times_ms, window_ms, bin_ms)
+    busiest = int(np.argmax(counts))
+    print(f"\nEvent density per {bin_ms:g} ms: mean {np.mean(counts):.2f}, "
+          f"max {counts[busiest]} at {busiest * bin_ms:g} ms")
+
+    print(f"\nCollision peaks (triggers within {collision_ms:g} ms):")
+    peaks = collision_peaks(times_ms, collision_ms, peak_count)
+    if not peaks:
+        print("  none")
+    for i, count in peaks:
+        members = body_indices[i:i + count]
+        frequencies = sorted({bodies[index]['frequency'] for index in members})
+        print(f"  {times_ms[i]:.1f} ms: {count} notes {', '.join(f'{f:g}' for f in frequencies)}")
+
+    if timeline_file:
+        export_timeline(timeline_file, bodies, times_ms, body_indices, directions)
+        print(f"\nTimeline written to {timeline_file}")
+    if midi_file:
+        write_midi_file(midi_file, bodies, times / FRAME_RATE, body_indices, [triggers[i] for i in line_indices])
+        print(f"\nMIDI file written to {midi_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the crossing timeline of a Polyorbit settings file.")
+    parser.add_argument('file', nargs='?', default='settings.ini')
+    parser.add_argument('--duration', type=float, help="seconds to analyse (default: one global cycle)")
+    parser.add_argument('--max-cycle', type=float, default=3600.0, help="longest cycle to search for, in seconds")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="pixel drift accepted as a near-repeat")
+    parser.add_argument('--bin-ms', type=float, default=1000.0, help="event density bin width")
+    parser.add_argument('--collision-ms', type=float, default=10.0, help="window for counting simultaneous notes")
+    parser.add_argument('--peaks', type=int, default=10, help="number of collision peaks to list")
+    parser.add_argument('--timeline', help="write every trigger to this CSV file")
+    parser.add_argument('--midi', help="write every trigger to this Standard MIDI File")
+    args = parser.parse_args()
+
+    analyze(args.file, args.duration, args.max_cycle, args.tolerance, args.bin_ms, args.collision_ms,
+            args.peaks, args.timeline, args.midi)
@@ -0,0 +1,66 @@
+import argparse
+import os
+import statistics
+import time
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # frames are drawn offscreen
+import pygame
+
+from memoryreport import synthetic_scene
+from orbitcore import BLACK, HEIGHT, WIDTH
+from orbitcore.arrays import SceneArrays
+from orbitcore.constants import FRAME_MS
+from orbitcore.render import SceneRenderer
+from orbitcore.settings import SUSTAIN_RELEASE_TIME, build_planets, read_scene
+
+# Zoomed right out, as the demos start, and zoomed in
+ZOOM_LEVELS = [0.1, 0.5, 1.0, 2.0]
+
+def spread(planets, seed=0):
+    # Bodies somewhere along their orbits, a third of them glowing, like a scene that has been playing
+    rng = np.random.default_rng(seed)
+    for planet in planets:
+        for body in planet.family():
+            body.angle = rng.uniform(0, 2 * np.pi)
+            body.glow = int(rng.integers(1, 256)) if rng.random() < 1 / 3 else 0
+
+def time_frames(planets, zoom_level, frames):
+    # Milliseconds for the first frame at `zoom_level`, which draws the orbits, and for each frame
+    # after it. Positions come in as a snapshot, the way the demos' simulation thread hands them over.
+    renderer = SceneRenderer()
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    arrays = SceneArrays(planets)
+    snapshot = (*arrays.positions(), arrays.glows())
+    times = []
+    for _ in range(frames + 1):
+        started = time.perf_counter()
+        surface.fill(BLACK)
+        renderer.draw(surface, planets, zoom_level, snapshot)
+        times.append((time.perf_counter() - started) * 1000)
+    return times[0], times[1:]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time drawing a large scene offscreen and check it fits in a frame.")
+    parser.add_argument('settings', nargs='?', help="settings file to draw (default: a generated scene)")
+    parser.add_argument('--bodies', type=int, default=5000, help="size of the generated scene")
+    parser.add_argument('--frames', type=int, default=60, help="frames to time at each zoom level")
+    parser.add_argument('--budget-ms', type=float, default=FRAME_MS, help="longest a frame may take on average")
+    args = parser.parse_args()
+
+    pygame.init()
+    scene = read_scene(args.settings) if args.settings else synthetic_scene(args.bodies)
+    planets = build_planets(scene, SUSTAIN_RELEASE_TIME)
+    spread(planets)
+    print(f"Scene: {args.settings or 'generated'}, {len(scene['bodies'])} bodies")
+
+    over = []
+    for zoom_level in ZOOM_LEVELS:
+        first, times = time_frames(planets, zoom_level, args.frames)
+        median = statistics.median(times)
+        print(f"Zoom {zoom_level:4.1f}: median {median:6.1f} ms, max {max(times):6.1f} ms, first frame {first:6.1f} ms")
+        if median > args.budget_ms:
+            over.append(zoom_level)
+    if over:
+        parser.exit(1, f"Over the {args.budget_ms:.1f} ms budget at zoom {', '.join(str(zoom) for zoom in over)}\n")
+    print(f"Every zoom level fits in {args.budget_ms:.1f} ms")
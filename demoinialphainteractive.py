@@ -1,208 +1,59 @@
+import time
+STARTED = time.perf_counter()  # the imports below are part of startup too
+
 import pygame
+import asyncio
 import math
+import argparse
+import logging
 import os
-from pyo import *
-import configparser
-import glob
-import pygame_gui
 import random
-from pygame_gui.elements import UIPanel, UILabel, UIButton, UIHorizontalSlider
-
-# Initialize Pygame
-pygame.init()
-
-# Screen setup
-WIDTH, HEIGHT = 1280, 720
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Polyorbit")
-
-# Colors
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-PURPLE = (128, 0, 128)
-BLUE = (0, 0, 255)
-RED = (255, 0, 0)
-
-# Orbit setup
-CENTER = (WIDTH // 2, HEIGHT // 2)
-
-# Pyo server setup
-s = Server().boot()
-s.start()
-
-# Scales
-SCALES = {
-    "C Major": [131, 147, 165, 175, 196, 220, 247, 261, 293, 329, 349, 392, 440, 493, 523, 587, 659, 698, 784, 880, 987],
-    "C Natural Minor": [131, 147, 156, 175, 196, 208, 247, 261, 293, 311, 349, 392, 415, 493, 523, 587, 622, 698, 784, 831, 987],
-    "C Harmonic Minor": [131, 147, 156, 175, 196, 208, 247, 261, 293, 311, 349, 392, 440, 493, 523, 587, 622, 698, 784, 880, 987],
-    "C Melodic Minor": [131, 147, 156, 175, 196, 220, 247, 261, 293, 311, 349, 392, 440, 493, 523, 587, 622, 698, 784, 880, 987],
-    "C Blues": [131, 156, 175, 185, 196, 233, 261, 311, 349, 370, 392, 466, 523, 622, 698, 740, 784, 932],
-    "C Pentatonic Major": [131, 147, 165, 196, 220, 261, 293, 329, 392, 440, 523, 587, 659, 784, 880],
-    "C Pentatonic Minor": [131, 156, 175, 196, 233, 261, 311, 349, 392, 466, 523, 622, 698, 784, 932],
-    "C Dorian": [131, 147, 156, 175, 196, 220, 233, 261, 293, 311, 349, 392, 440, 466, 523, 587, 622, 698, 784, 880, 932],
-    "C Phrygian": [131, 139, 165, 175, 196, 208, 247, 261, 277, 329, 349, 392, 415, 493, 523, 554, 659, 698, 784, 831, 987],
-    "C Lydian": [131, 147, 165, 185, 196, 220, 247, 261, 293, 329, 370, 392, 440, 493, 523, 587, 659, 740, 784, 880, 987],
-    "C Mixolydian": [131, 147, 165, 175, 196, 220, 233, 261, 293, 329, 349, 392, 440, 466, 523, 587, 659, 698, 784, 880, 932],
-    "C Locrian": [131, 139, 165, 175, 185, 208, 247, 261, 277, 329, 349, 370, 415, 493, 523, 554, 659, 698, 740, 831, 987],
-    "C Whole Tone": [131, 147, 165, 185, 208, 233, 261, 293, 329, 370, 415, 466, 523, 587, 659, 740, 831, 932],
-    "C Diminished": [131, 147, 156, 175, 185, 208, 220, 247, 261, 293, 311, 349, 370, 415, 440, 493, 523, 587, 622, 698, 740, 831, 880, 987],
-    "C Augmented": [131, 147, 165, 185, 208, 233, 261, 293, 329, 370, 415, 466, 523, 587, 659, 740, 831, 932],
-    "C Bebop Dominant": [131, 147, 165, 175, 196, 220, 233, 247, 261, 293, 329, 349, 392, 440, 466, 493, 523, 587, 659, 698, 784, 880, 932, 987],
-    "C Bebop Major": [131, 147, 165, 175, 196, 208, 220, 247, 261, 293, 329, 349, 392, 415, 440, 493, 523, 587, 659, 698, 784, 831, 880, 987],
-    "C Altered": [131, 139, 165, 175, 185, 208, 233, 261, 277, 329, 349, 370, 415, 466, 523, 554, 659, 698, 740, 831, 932],
-}
-
-def get_frequency_in_scale(size, is_planet, has_moons, scale):
-    scale_frequencies = SCALES[scale]
-    
-    if is_planet:
-        inverted_size = 50 - size
-        if has_moons:
-            index = inverted_size * (len(scale_frequencies) // 2) // 50
-        else:
-            index = (inverted_size * (len(scale_frequencies) // 2) // 50) + (len(scale_frequencies) // 4)
-    else:
-        inverted_size = 15 - size
-        index = (inverted_size * (len(scale_frequencies) // 2) // 15) + (len(scale_frequencies) // 2)
-    
-    return scale_frequencies[min(max(index, 0), len(scale_frequencies) - 1)]
-
-class CelestialBody:
-    def __init__(self, radius, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file=None):
-        self.radius = radius
-        self.size = size
-        self.angle = 0
-        self.frequency = frequency
-        self.eccentricity = eccentricity
-        self.orbit_angle = orbit_angle
-        self.sound_file = sound_file
-        if sound_file and os.path.isfile(sound_file):
-            self.sound = SfPlayer(sound_file, loop=False)
-        else:
-            self.sound = Sine(freq=frequency, mul=0.3)
-        self.env = Adsr(attack=0.01, decay=size/100, sustain=min(size/200, sustain_release_time), release=sustain_release_time, dur=size/10, mul=self.sound.mul)
-        self.sound.mul = self.env
-        self.sound.out()
-        self.last_x = CENTER[0] + radius
-        self.glow = 0
-
-    def update(self, speed_multiplier):
-        angular_velocity = speed_multiplier * (1 / self.radius)
-        self.angle = (self.angle + angular_velocity) % (2 * math.pi)
-        current_x = self.calculate_position()[0]
-        if (self.last_x < CENTER[0] and current_x >= CENTER[0]) or (self.last_x > CENTER[0] and current_x <= CENTER[0]):
-            self.env.play()
-            self.glow = 255
-        self.last_x = current_x
-        
-        if self.glow > 0:
-            self.glow = max(0, self.glow - 10)
-
-    def calculate_position(self):
-        r = self.radius * (1 - self.eccentricity**2) / (1 + self.eccentricity * math.cos(self.angle))
-        x = CENTER[0] + int(r * math.cos(self.angle + self.orbit_angle))
-        y = CENTER[1] + int(r * math.sin(self.angle + self.orbit_angle))
-        return x, y
-
-    def draw(self, color, zoom_level):
-        x, y = self.calculate_position()
-        x = int((x - CENTER[0]) * zoom_level + CENTER[0])
-        y = int((y - CENTER[1]) * zoom_level + CENTER[1])
-        
-        if self.glow > 0:
-            glow_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, (*color, self.glow), (x, y), int(max(self.size * zoom_level * 1.5, 1)))
-            screen.blit(glow_surface, (0, 0))
-        
-        pygame.draw.circle(screen, color, (x, y), int(max(self.size * zoom_level, 1)))
-
-class Planet(CelestialBody):
-    def __init__(self, radius, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file=None):
-        super().__init__(radius, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file)
-        self.moons = []
-
-    def add_moon(self, moon):
-        self.moons.append(moon)
-
-    def update(self, speed_multiplier):
-        super().update(speed_multiplier)
-        for moon in self.moons:
-            moon.update(speed_multiplier)
-
-    def draw(self, zoom_level):
-        super().draw(WHITE, zoom_level)
-        for moon in self.moons:
-            moon.draw(zoom_level)
-
-class Moon(CelestialBody):
-    def __init__(self, planet, distance, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file=None):
-        super().__init__(distance, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file)
-        self.planet = planet
-
-    def calculate_position(self):
-        planet_x, planet_y = self.planet.calculate_position()
-        r = self.radius * (1 - self.eccentricity**2) / (1 + self.eccentricity * math.cos(self.angle))
-        x = planet_x + int(r * math.cos(self.angle + self.orbit_angle))
-        y = planet_y + int(r * math.sin(self.angle + self.orbit_angle))
-        return x, y
-
-    def draw(self, zoom_level):
-        x, y = self.calculate_position()
-        x = int((x - CENTER[0]) * zoom_level + CENTER[0])
-        y = int((y - CENTER[1]) * zoom_level + CENTER[1])
-        
-        if self.glow > 0:
-            glow_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, (BLUE[0], BLUE[1], BLUE[2], self.glow), (x, y), int(max(self.size * zoom_level * 1.5, 1)))
-            screen.blit(glow_surface, (0, 0))
-        
-        pygame.draw.circle(screen, BLUE, (x, y), int(max(self.size * zoom_level, 1)))
 
-def load_settings(file, SUSTAIN_RELEASE_TIME):
-    config = configparser.ConfigParser()
-    config.read(file)
-    
-    planets = []
-    
-    global_settings = config['Global']
-    speed_multiplier = float(global_settings['SpeedMultiplier'])
-    sustain_release_time = float(global_settings.get('SustainReleaseTime', SUSTAIN_RELEASE_TIME))
-    elliptical_orbits = global_settings.getboolean('EllipticalOrbits')
-    
-    num_planets = int(global_settings['NumberOfPlanets'])
-    
-    for i in range(1, num_planets + 1):
-        section = f'Planet{i}'
-        size = int(config[section]['Size'])
-        frequency = float(config[section]['Frequency'])
-        distance = int(config[section]['Distance'])
-        eccentricity = float(config[section]['Eccentricity']) if elliptical_orbits else 0.0
-        orbit_angle = float(config[section]['OrbitAngle']) if elliptical_orbits else 0.0
-        sound_file = config[section].get('SoundFile', '').strip()
-        num_moons = int(config[section]['NumberOfMoons'])
-        
-        planet = Planet(distance, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file if sound_file else None)
-        planet.angle = 0  # Reset the starting angle
-        
-        for j in range(1, num_moons + 1):
-            moon_section = f'Planet{i}Moon{j}'
-            moon_size = int(config[moon_section]['Size'])
-            moon_frequency = float(config[moon_section]['Frequency'])
-            moon_distance = int(config[moon_section]['Distance'])
-            moon_eccentricity = float(config[moon_section]['Eccentricity']) if elliptical_orbits else 0.0
-            moon_orbit_angle = float(config[moon_section]['OrbitAngle']) if elliptical_orbits else 0.0
-            moon_sound_file = config[moon_section].get('SoundFile', '').strip()
-            
-            moon = Moon(planet, moon_distance, moon_size, moon_frequency, moon_eccentricity, moon_orbit_angle, 
-                        sustain_release_time, moon_sound_file if moon_sound_file else None)
-            moon.angle = 0  # Reset moon starting angle
-            planet.add_moon(moon)
-        
-        planets.append(planet)
-    
-    return planets, speed_multiplier, sustain_release_time
+from orbitcore import (BLACK, CENTER, FRAME_RATE, HEIGHT, SCALES, WHITE, WIDTH, Moon, Planet, get_frequency_in_scale,
+                       read_audio_settings, read_scene, update_settings_file, update_settings_ini)
+from orbitcore.audio import PyoAudio, Recorder, add_audio_arguments, audio_options
+from orbitcore.display import Display, draw_trigger_lines
+from orbitcore.library import SceneLibrary, format_cycle
+from orbitcore.preload import BOUNDARIES, ScenePreloader, SceneSwitcher, build_scene
+from orbitcore.render import SceneRenderer
+from orbitcore.runtime import Runtime, SettingsWriter
+from orbitcore.simulation import Simulation, SimulationWorker
+from orbitcore.startup import StartupTimer
+from orbitcore.trails import add_trail_arguments, trails_from_args
+from orbitcore.ui import TextCache, set_record_colours
+
+# Length of the scrub bar in seconds
+SCRUB_RANGE = 3600
+
+# Seconds two scenes overlap when switching
+CROSSFADE_TIME = 2.0
+
+# Scenes listed in the dropdown at once; picking the last entry lists more
+LIBRARY_PAGE = 40
+MORE_SCENES = 'More...'
+
+def start_audio(audio, file, parsed, timer):
+    # Runs on a startup thread: boots pyo, then builds the scene's voices once the settings are parsed
+    with timer.step("boot audio"):
+        audio.boot()
+    scene = parsed.result()
+    with timer.step("build scene with audio"):
+        return build_scene(file, scene, audio)
+
+def draw_loading_frame(screen, renderer, scene, text_cache, manager=None):
+    # The scene where it starts, silent and still, until the audio is ready
+    screen.fill(BLACK)
+    draw_trigger_lines(screen, scene.triggers.lines)
+    renderer.draw(screen, scene.planets, 1.0)
+    pygame.draw.circle(screen, WHITE, CENTER, 5)
+    text = text_cache.render("Starting audio...", 24, WHITE)
+    screen.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT - 30)))
+    if manager:
+        manager.draw_ui(screen)
+    pygame.display.flip()
 
 def open_settings_gui(manager, distance):
+    import pygame_gui
     settings_window = pygame_gui.elements.UIWindow(
         pygame.Rect(50, 50, 300, 450),
         manager,
@@ -245,7 +96,7 @@ def open_settings_gui(manager, distance):
     
     return settings_window, size_entry, eccentricity_entry, scale_dropdown, moon_count_entry, confirm_button
 
-def create_new_orbit(settings, planets, SUSTAIN_RELEASE_TIME):
+def create_new_orbit(settings, planets, SUSTAIN_RELEASE_TIME, audio=None, trigger_lines=()):
     size = int(settings['size'])
     distance = int(settings['distance'])
     eccentricity = float(settings['eccentricity'])
@@ -254,7 +105,7 @@ def create_new_orbit(settings, planets, SUSTAIN_RELEASE_TIME):
     moon_count = int(settings['moon_count'])
 
     frequency = get_frequency_in_scale(size, True, moon_count > 0, scale)
-    new_planet = Planet(distance, size, frequency, eccentricity, orbit_angle, SUSTAIN_RELEASE_TIME)
+    new_planet = Planet(distance, size, frequency, eccentricity, orbit_angle, SUSTAIN_RELEASE_TIME, audio=audio)
     
     if moon_count > 0:
         min_moon_distance = size + 10
@@ -272,65 +123,33 @@ def create_new_orbit(settings, planets, SUSTAIN_RELEASE_TIME):
             moon_frequency = get_frequency_in_scale(moon_size, False, False, scale)
             moon_eccentricity = random.uniform(0, eccentricity)
             moon_orbit_angle = random.uniform(0, 2 * math.pi)
-            new_moon = Moon(new_planet, moon_distance, moon_size, moon_frequency, moon_eccentricity, moon_orbit_angle, SUSTAIN_RELEASE_TIME)
+            new_moon = Moon(new_planet, moon_distance, moon_size, moon_frequency, moon_eccentricity, moon_orbit_angle, SUSTAIN_RELEASE_TIME, audio=audio)
             new_planet.add_moon(new_moon)
 
+    for body in new_planet.family():
+        for line in trigger_lines:
+            body.line_voice(line)  # so no pyo objects are made while playing
     planets.append(new_planet)
     return new_planet
 
-def update_settings_file(filename, planets, GLOBAL_SPEED_MULTIPLIER, elliptical_orbits, SUSTAIN_RELEASE_TIME):
-    config = configparser.ConfigParser()
-    config['Global'] = {
-        'NumberOfPlanets': str(len(planets)),
-        'SpeedMultiplier': str(GLOBAL_SPEED_MULTIPLIER),
-        'EllipticalOrbits': str(elliptical_orbits).lower(),
-        'MaxEccentricity': '0.99',
-        'SelectedScale': 'C Major',
-        'SustainReleaseTime': str(SUSTAIN_RELEASE_TIME)
-    }
-    
-    for i, planet in enumerate(planets, 1):
-        planet_section = f'Planet{i}'
-        config[planet_section] = {
-            'Size': str(planet.size),
-            'Frequency': str(planet.frequency),
-            'Distance': str(planet.radius),
-            'NumberOfMoons': str(len(planet.moons)),
-            'Eccentricity': f"{planet.eccentricity:.4f}",
-            'OrbitAngle': f"{planet.orbit_angle:.4f}",
-            'SoundFile': ''
-        }
-        
-        for j, moon in enumerate(planet.moons, 1):
-            moon_section = f'{planet_section}Moon{j}'
-            config[moon_section] = {
-                'Size': str(moon.size),
-                'Frequency': str(moon.frequency),
-                'Distance': str(moon.radius),
-                'Eccentricity': f"{moon.eccentricity:.4f}",
-                'OrbitAngle': f"{moon.orbit_angle:.4f}",
-                'SoundFile': ''
-            }
-    
-    with open(filename, 'w') as configfile:
-        config.write(configfile)
-
-def create_adjustments_panel(manager):
+def create_adjustments_panel(manager, speed_multiplier, sustain_release_time):
+    from pygame_gui.elements import UIPanel, UILabel, UIHorizontalSlider
     panel = UIPanel(pygame.Rect(WIDTH - 250, 50, 240, 200), 
                     manager=manager)
     
     UILabel(pygame.Rect(10, 10, 220, 30), "Global Speed Multiplier", manager=manager, container=panel)
     speed_slider = UIHorizontalSlider(pygame.Rect(10, 40, 220, 20), 
-                                      GLOBAL_SPEED_MULTIPLIER, (0.1, 10.0), manager=manager, container=panel)
+                                      speed_multiplier, (0.1, 10.0), manager=manager, container=panel)
     
     UILabel(pygame.Rect(10, 70, 220, 30), "Sustain/Release Time", manager=manager, container=panel)
     sustain_release_slider = UIHorizontalSlider(pygame.Rect(10, 100, 220, 20), 
-                                                SUSTAIN_RELEASE_TIME, (0.1, 2.0), manager=manager, container=panel)
+                                                sustain_release_time, (0.1, 2.0), manager=manager, container=panel)
     
     return panel, speed_slider, sustain_release_slider
 
 def create_planet_info_popup(manager, planet, planet_index):
-    popup = UIPanel(pygame.Rect(WIDTH // 2 - 150, HEIGHT // 2 - 150, 300, 300), 
+    from pygame_gui.elements import UIPanel, UILabel, UIButton, UIHorizontalSlider
+    popup = UIPanel(pygame.Rect(WIDTH // 2 - 150, HEIGHT // 2 - 175, 300, 350), 
                     manager=manager)
     
     y_offset = 10
@@ -345,7 +164,20 @@ def create_planet_info_popup(manager, planet, planet_index):
     UILabel(pygame.Rect(10, y_offset, 280, 30), f"Eccentricity: {planet.eccentricity:.4f}", manager=manager, container=popup)
     y_offset += 30
     UILabel(pygame.Rect(10, y_offset, 280, 30), f"Number of Moons: {len(planet.moons)}", manager=manager, container=popup)
-    y_offset += 40
+    y_offset += 30
+
+    # Gain and mute act on the planet's bus, so they cover its moons too
+    gain_slider = None
+    mute_button = None
+    if planet.bus:
+        UILabel(pygame.Rect(10, y_offset, 60, 30), "Gain", manager=manager, container=popup)
+        gain_slider = UIHorizontalSlider(pygame.Rect(70, y_offset + 5, 130, 20),
+                                         planet.bus.level, (0.0, 2.0), manager=manager, container=popup)
+        mute_button = UIButton(pygame.Rect(210, y_offset, 80, 30),
+                               "Unmute" if planet.bus.muted else "Mute",
+                               manager=manager,
+                               container=popup)
+    y_offset += 50
     
     delete_button = UIButton(pygame.Rect(10, y_offset, 280, 30), 
                              "Delete Planet", 
@@ -357,277 +189,424 @@ def create_planet_info_popup(manager, planet, planet_index):
                             manager=manager, 
                             container=popup)
     
-    return popup, delete_button, close_button
-
-def update_settings_ini(filename, global_speed_multiplier, sustain_release_time):
-    config = configparser.ConfigParser()
-    config.read(filename)
-    
-    if 'Global' not in config:
-        config['Global'] = {}
-    
-    config['Global']['SpeedMultiplier'] = str(global_speed_multiplier)
-    config['Global']['SustainReleaseTime'] = str(sustain_release_time)
-    
-    with open(filename, 'w') as configfile:
-        config.write(configfile)
-
-def draw_edit_mode_text(screen, time):
-    font = pygame.font.Font(None, 36)
-    text = font.render("Edit Mode", True, (255, 255, 0))
+    return popup, delete_button, close_button, gain_slider, mute_button
+
+def create_scrub_controls(manager):
+    from pygame_gui.elements import UILabel, UIHorizontalSlider
+    scrub_slider = UIHorizontalSlider(pygame.Rect(10, HEIGHT - 40, 400, 20),
+                                      0, (0, SCRUB_RANGE), manager=manager)
+    scrub_label = UILabel(pygame.Rect(420, HEIGHT - 45, 100, 30), format_playback_time(0), manager=manager)
+    return scrub_slider, scrub_label
+
+def format_playback_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+def create_scene_dropdown(manager, library, query, limit, current):
+    from pygame_gui.elements import UIDropDownMenu
+    found, total = library.find(query, limit)
+    options = [path for path, meta in found]
+    if current not in options:
+        options.insert(0, current)
+    if total > limit:
+        options.append(MORE_SCENES)
+    return UIDropDownMenu(options_list=options, starting_option=current,
+                          relative_rect=pygame.Rect((10, 10), (200, 30)), manager=manager)
+
+def format_scene_info(meta):
+    if not meta:
+        return ""
+    return f"{meta['bodies']} bodies, {meta['scale']}, speed {meta['speed']:g}, cycle {format_cycle(meta['cycle'])}"
+
+def format_audio_load(monitor):
+    text = f"Audio {monitor.load:.0%}, {monitor.voice_count} voices"
+    return f"{text}: {monitor.step}" if monitor.step else text
+
+def draw_edit_mode_text(screen, text_cache, time):
+    text = text_cache.render("Edit Mode", 36, (255, 255, 0))
     alpha = int(127 + 127 * math.sin(time * 5))  # Pulsing effect
     text.set_alpha(alpha)
     text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT - 30))
     screen.blit(text, text_rect)
 
-# Initialize SUSTAIN_RELEASE_TIME with a default value
-SUSTAIN_RELEASE_TIME = 0.5
-
-# Load planets from settings.ini
-planets, GLOBAL_SPEED_MULTIPLIER, SUSTAIN_RELEASE_TIME = load_settings('settings.ini', SUSTAIN_RELEASE_TIME)
-
-# GUI setup
-manager = pygame_gui.UIManager((WIDTH, HEIGHT))
-
-# Dropdown for .ini file selection
-ini_files = glob.glob('*.ini')
-dropdown = pygame_gui.elements.UIDropDownMenu(
-    options_list=ini_files,
-    starting_option='settings.ini',
-    relative_rect=pygame.Rect((10, 10), (200, 30)),
-    manager=manager
-)
-
-# Button for sound recording
-record_button = pygame_gui.elements.UIButton(
-    relative_rect=pygame.Rect((220, 10), (150, 30)),
-    text='Output for Suno',
-    manager=manager
-)
-
-# Add adjustments panel
-adjustments_panel, speed_slider, sustain_release_slider = create_adjustments_panel(manager)
-speed_slider.set_current_value(GLOBAL_SPEED_MULTIPLIER)
-sustain_release_slider.set_current_value(SUSTAIN_RELEASE_TIME)
-
-# Recording variables
-is_recording = False
-record_start_time = 0
-record_counter = 0
-RECORDING_DURATION = 19000  # 19 seconds in milliseconds
-
-def start_recording():
-    global is_recording, record_start_time, record_counter
-    is_recording = True
-    record_start_time = pygame.time.get_ticks()
-    filename = f"recording_{record_counter}.wav"
-    s.recstart(filename)
-
-def stop_recording():
-    global is_recording, record_counter
-    is_recording = False
-    s.recstop()
-    record_counter += 1
-
-# Global variables
-running = True
-clock = pygame.Clock()
-zoom_level = 1.0
-min_zoom = 0.01
-max_zoom = 10.0
-paused = False
-edit_mode = False
-adding_orbit = False
-new_orbit_settings = None
-initial_click_pos = None
-selected_planet = None
-planet_info_popup = None
-delete_button = None
-close_button = None
-pulse_time = 0
-
-while running:
-    time_delta = clock.tick(60) / 1000.0
-    pulse_time += time_delta
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 4:  # Scroll up
-                zoom_level *= 1.1
-                zoom_level = min(zoom_level, max_zoom)
-            elif event.button == 5:  # Scroll down
-                zoom_level /= 1.1
-                zoom_level = max(zoom_level, min_zoom)
-            elif event.button == 1:  # Left click
-                mouse_pos = pygame.mouse.get_pos()
-                for i, planet in enumerate(planets):
-                    planet_pos = planet.calculate_position()
-                    scaled_pos = ((planet_pos[0] - CENTER[0]) * zoom_level + CENTER[0],
-                                  (planet_pos[1] - CENTER[1]) * zoom_level + CENTER[1])
-                    distance = math.hypot(mouse_pos[0] - scaled_pos[0], mouse_pos[1] - scaled_pos[1])
-                    if distance <= planet.size * zoom_level:
-                        selected_planet = planet
-                        if planet_info_popup:
-                            planet_info_popup.kill()
-                        planet_info_popup, delete_button, close_button = create_planet_info_popup(manager, planet, i)
-                        break
-                else:
-                    if edit_mode and not adding_orbit:
-                        initial_click_pos = event.pos
-                        adding_orbit = True
-                        distance = int(math.hypot(initial_click_pos[0] - CENTER[0], initial_click_pos[1] - CENTER[1]) / zoom_level)
-                        new_orbit_settings, size_entry, eccentricity_entry, scale_dropdown, moon_count_entry, confirm_button = open_settings_gui(manager, distance)
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                paused = not paused
-                edit_mode = paused
-                if not edit_mode:
+async def main(runtime):
+    parser = argparse.ArgumentParser(description="Polyorbit interactive demo")
+    parser.add_argument('preload', nargs='*', help="scenes to build in the background so switching to them is instant")
+    parser.add_argument('--single-thread', action='store_true', help="run the simulation inside the frame loop")
+    parser.add_argument('--library', action='append', help="directory of scenes to list, may be given more than once (default: .)")
+    add_audio_arguments(parser)
+    add_trail_arguments(parser)
+    parser.add_argument('--startup-times', action='store_true', help="print how long each startup step took")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    timer = StartupTimer(STARTED)
+    timer.mark("main")
+
+    # pyo boots and settings.ini is parsed on startup threads while the window opens and the GUI is built
+    audio = PyoAudio(**audio_options(args, read_audio_settings('settings.ini')))
+    parsed = runtime.executor.submit(timer.call, "parse settings.ini", read_scene, 'settings.ini')
+    loaded = runtime.executor.submit(start_audio, audio, 'settings.ini', parsed, timer)
+
+    with timer.step("open window"):
+        display = Display()
+        screen = display.screen
+    renderer = SceneRenderer(trails=trails_from_args(args))
+    text_cache = TextCache()
+    with timer.step("first frame"):
+        preview = build_scene('settings.ini', parsed.result())
+        draw_loading_frame(screen, renderer, preview, text_cache)
+    SUSTAIN_RELEASE_TIME = preview.sustain_release_time
+
+    # pygame_gui takes longer to import than the window takes to open, so it waits until the first
+    # frame is up; the functions building the GUI import what they use from it the same way
+    with timer.step("import pygame_gui"):
+        import pygame_gui
+        from pygame_gui.elements import UILabel, UITextEntryLine
+
+    # GUI setup
+    gui_started = time.perf_counter()
+    manager = pygame_gui.UIManager((WIDTH, HEIGHT))
+
+    # Dropdown for .ini file selection, filled from a library that keeps scanning in the background
+    library = SceneLibrary(args.library or ['.'])
+    library.start()
+    current_file = os.path.normpath('settings.ini')
+    scene_query = ''
+    scene_limit = LIBRARY_PAGE
+    dropdown = create_scene_dropdown(manager, library, scene_query, scene_limit, current_file)
+    shown_library = (library.version, scene_query, scene_limit)
+    scene_filter = UITextEntryLine(pygame.Rect((10, 45), (200, 30)), manager=manager,
+                                   placeholder_text="Filter, e.g. minor cycle<60")
+    scene_info = UILabel(pygame.Rect((220, 45), (400, 30)), format_scene_info(library.metadata(current_file)), manager=manager)
+
+    # Button for sound recording
+    record_button = pygame_gui.elements.UIButton(
+        relative_rect=pygame.Rect((220, 10), (150, 30)),
+        text='Output for Suno',
+        manager=manager
+    )
+
+    # When a newly chosen scene takes over
+    switch_boundary = 'Next downbeat'
+    boundary_dropdown = pygame_gui.elements.UIDropDownMenu(
+        options_list=BOUNDARIES,
+        starting_option=switch_boundary,
+        relative_rect=pygame.Rect((380, 10), (170, 30)),
+        manager=manager
+    )
+
+    # Add adjustments panel
+    adjustments_panel, speed_slider, sustain_release_slider = create_adjustments_panel(manager, preview.speed_multiplier, SUSTAIN_RELEASE_TIME)
+    speed_slider.set_current_value(preview.speed_multiplier)
+    sustain_release_slider.set_current_value(SUSTAIN_RELEASE_TIME)
+
+    # Timeline scrubbing
+    scrub_slider, scrub_label = create_scrub_controls(manager)
+    load_label = UILabel(pygame.Rect(WIDTH - 330, 10, 320, 30), format_audio_load(audio.monitor), manager=manager)
+    timer.add("build GUI", gui_started, time.perf_counter())
+
+    # The window stays responsive while the audio scene is still being built
+    running = True
+    async for time_delta in runtime.ticks(60):
+        if loaded.done():
+            break
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            manager.process_events(event)
+        manager.update(time_delta)
+        draw_loading_frame(screen, renderer, preview, text_cache, manager)
+    scene = loaded.result()
+
+    preloader = ScenePreloader(audio)
+    for file in args.preload:
+        preloader.preload(file, SUSTAIN_RELEASE_TIME)
+    switcher = SceneSwitcher(CROSSFADE_TIME)
+    cued_file = None
+    cue_task = None
+
+    # Orbits and triggers run on their own thread unless asked not to
+    sim = Simulation(scene, switcher)
+    worker = None if args.single_thread else SimulationWorker(sim)
+    planets = sim.planets
+    seen_switches = 0
+
+    # Recording in 19 second segments
+    recorder = Recorder(audio, duration=19000)
+    shown_recording = None
+
+    # Settings changes are written off the frame loop, the latest of each at most twice a second
+    writer = SettingsWriter(runtime)
+
+    # Loop state
+    zoom_level = 1.0
+    min_zoom = 0.01
+    max_zoom = 10.0
+    paused = False
+    edit_mode = False
+    adding_orbit = False
+    new_orbit_settings = None
+    initial_click_pos = None
+    selected_planet = None
+    planet_info_popup = None
+    delete_button = None
+    close_button = None
+    gain_slider = None
+    mute_button = None
+    pulse_time = 0
+    shown_second = 0
+
+    async def cue_when_loaded(file):
+        # Waits for the background load, then hands it to the switcher
+        try:
+            await asyncio.shield(asyncio.wrap_future(preloader.future(file, SUSTAIN_RELEASE_TIME)))
+        except Exception:
+            pass  # take() raises it again below
+        try:
+            with sim.lock:
+                switcher.cue(preloader.take(file), planets, switch_boundary)
+        except Exception as e:
+            logging.warning("Could not load %s: %s", file, e)
+
+    async def add_orbit(settings, click_pos, sustain_release_time):
+        # Building the voices of a new planet can take a while, so it happens on the thread pool
+        new_planet = await runtime.offload(create_new_orbit, settings, [], sustain_release_time, sim.scene.bus,
+                                           sim.scene.triggers.lines)
+        with sim.lock:
+            planets.append(new_planet)
+            dx = click_pos[0] - CENTER[0]
+            dy = click_pos[1] - CENTER[1]
+            new_planet.angle = math.atan2(dy, dx) - new_planet.orbit_angle
+            new_planet.anchor(sim.orbit_time)
+
+    def update_recording():
+        if not paused:
+            recorder.update(pygame.time.get_ticks())
+
+    def update_audio_load():
+        # Shed audio load if needed and show it
+        audio.monitor.update()
+        load_text = format_audio_load(audio.monitor)
+        if load_text != load_label.text:
+            load_label.set_text(load_text)
+
+    # Each runs at its own rate alongside the frame loop below
+    runtime.every(0.1, update_recording)
+    runtime.every(0.1, update_audio_load)
+    if worker:
+        worker.start()
+    else:
+        runtime.every(1 / FRAME_RATE, lambda: sim.tick(pygame.time.get_ticks()))
+    timer.mark("playing")
+    if args.startup_times:
+        print(timer.report())
+
+    async for time_delta in runtime.ticks(60):
+        if not running:
+            break
+        pulse_time += time_delta
+
+        # Pick up a scene switch made by the simulation
+        if sim.switches != seen_switches:
+            seen_switches = sim.switches
+            planets, SUSTAIN_RELEASE_TIME = sim.planets, sim.scene.sustain_release_time
+            speed_slider.set_current_value(sim.speed_multiplier)
+            sustain_release_slider.set_current_value(SUSTAIN_RELEASE_TIME)
+            scrub_slider.set_current_value(0)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 4:  # Scroll up
+                    zoom_level *= 1.1
+                    zoom_level = min(zoom_level, max_zoom)
+                elif event.button == 5:  # Scroll down
+                    zoom_level /= 1.1
+                    zoom_level = max(zoom_level, min_zoom)
+                elif event.button == 1:  # Left click
+                    mouse_pos = pygame.mouse.get_pos()
+                    for i, planet in enumerate(planets):
+                        planet_pos = planet.calculate_position()
+                        scaled_pos = ((planet_pos[0] - CENTER[0]) * zoom_level + CENTER[0],
+                                      (planet_pos[1] - CENTER[1]) * zoom_level + CENTER[1])
+                        distance = math.hypot(mouse_pos[0] - scaled_pos[0], mouse_pos[1] - scaled_pos[1])
+                        if distance <= planet.size * zoom_level:
+                            selected_planet = planet
+                            if planet_info_popup:
+                                planet_info_popup.kill()
+                            planet_info_popup, delete_button, close_button, gain_slider, mute_button = create_planet_info_popup(manager, planet, i)
+                            break
+                    else:
+                        if edit_mode and not adding_orbit:
+                            initial_click_pos = event.pos
+                            adding_orbit = True
+                            distance = int(math.hypot(initial_click_pos[0] - CENTER[0], initial_click_pos[1] - CENTER[1]) / zoom_level)
+                            new_orbit_settings, size_entry, eccentricity_entry, scale_dropdown, moon_count_entry, confirm_button = open_settings_gui(manager, distance)
+            elif event.type == pygame.KEYDOWN and not scene_filter.is_focused:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                    sim.paused = paused
+                    edit_mode = paused
+                    if not edit_mode:
+                        adding_orbit = False
+                        if new_orbit_settings:
+                            new_orbit_settings.kill()
+                        writer.save(update_settings_file, 'settings.ini', list(planets), sim.speed_multiplier, True, SUSTAIN_RELEASE_TIME)
+            elif event.type == pygame_gui.UI_DROP_DOWN_MENU_CHANGED:
+                if event.ui_element == dropdown and event.text == MORE_SCENES:
+                    scene_limit += LIBRARY_PAGE
+                elif event.ui_element == dropdown:
+                    loading = cue_task and not cue_task.done()
+                    if not (loading and event.text == cued_file):
+                        if loading:
+                            # Picked something else before the last pick finished loading
+                            cue_task.cancel()
+                            preloader.discard(cued_file)
+                        cue_task = runtime.spawn(cue_when_loaded(event.text))
+                    cued_file = current_file = event.text
+                    scene_info.set_text(format_scene_info(library.metadata(cued_file)))
+                elif event.ui_element == boundary_dropdown:
+                    switch_boundary = event.text
+            elif event.type == pygame_gui.UI_TEXT_ENTRY_CHANGED and event.ui_element == scene_filter:
+                scene_query = event.text
+                scene_limit = LIBRARY_PAGE
+            elif event.type == pygame_gui.UI_BUTTON_PRESSED:
+                if event.ui_element == record_button:
+                    if recorder.toggle(pygame.time.get_ticks()):
+                        record_button.set_text('Stop Recording')
+                    else:
+                        record_button.set_text('Output for Suno')
+                elif adding_orbit and event.ui_element == confirm_button:
+                    new_settings = {
+                        'size': size_entry.get_text(),
+                        'distance': int(math.hypot(initial_click_pos[0] - CENTER[0], initial_click_pos[1] - CENTER[1]) / zoom_level),
+                        'eccentricity': eccentricity_entry.get_text(),
+                        'scale': scale_dropdown.selected_option,
+                        'moon_count': moon_count_entry.get_text()
+                    }
+                    runtime.spawn(add_orbit(new_settings, initial_click_pos, SUSTAIN_RELEASE_TIME))
                     adding_orbit = False
-                    if new_orbit_settings:
-                        new_orbit_settings.kill()
-                    update_settings_file('settings.ini', planets, GLOBAL_SPEED_MULTIPLIER, True, SUSTAIN_RELEASE_TIME)
-        elif event.type == pygame_gui.UI_DROP_DOWN_MENU_CHANGED:
-            if event.ui_element == dropdown:
-                selected_file = event.text
-                planets, GLOBAL_SPEED_MULTIPLIER, SUSTAIN_RELEASE_TIME = load_settings(selected_file, SUSTAIN_RELEASE_TIME)
-                speed_slider.set_current_value(GLOBAL_SPEED_MULTIPLIER)
-                sustain_release_slider.set_current_value(SUSTAIN_RELEASE_TIME)
-        elif event.type == pygame_gui.UI_BUTTON_PRESSED:
-            if event.ui_element == record_button:
-                if is_recording:
-                    stop_recording()
-                    record_button.set_text('Output for Suno')
-                else:
-                    start_recording()
-                    record_button.set_text('Stop Recording')
-            elif adding_orbit and event.ui_element == confirm_button:
-                new_settings = {
-                    'size': size_entry.get_text(),
-                    'distance': int(math.hypot(initial_click_pos[0] - CENTER[0], initial_click_pos[1] - CENTER[1]) / zoom_level),
-                    'eccentricity': eccentricity_entry.get_text(),
-                    'scale': scale_dropdown.selected_option,
-                    'moon_count': moon_count_entry.get_text()
-                }
-                new_planet = create_new_orbit(new_settings, planets, SUSTAIN_RELEASE_TIME)
-                dx = initial_click_pos[0] - CENTER[0]
-                dy = initial_click_pos[1] - CENTER[1]
-                new_planet.angle = math.atan2(dy, dx) - new_planet.orbit_angle
-                adding_orbit = False
-                new_orbit_settings.kill()
-            elif delete_button and event.ui_element == delete_button:
-                planets.remove(selected_planet)
-                if planet_info_popup:
-                    planet_info_popup.kill()
-                selected_planet = None
-                delete_button = None
-                close_button = None
-                update_settings_file('settings.ini', planets, GLOBAL_SPEED_MULTIPLIER, True, SUSTAIN_RELEASE_TIME)
-            elif close_button and event.ui_element == close_button:
-                if planet_info_popup:
-                    planet_info_popup.kill()
-                selected_planet = None
-                delete_button = None
-                close_button = None
-        elif event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
-            if event.ui_element == speed_slider:
-                GLOBAL_SPEED_MULTIPLIER = event.value
-            elif event.ui_element == sustain_release_slider:
-                SUSTAIN_RELEASE_TIME = event.value
-                for planet in planets:
-                    planet.env.sustain = min(planet.size/200, SUSTAIN_RELEASE_TIME)
-                    planet.env.release = SUSTAIN_RELEASE_TIME
-                    for moon in planet.moons:
-                        moon.env.sustain = min(moon.size/200, SUSTAIN_RELEASE_TIME)
-                        moon.env.release = SUSTAIN_RELEASE_TIME
-            update_settings_ini('settings.ini', GLOBAL_SPEED_MULTIPLIER, SUSTAIN_RELEASE_TIME)
-
-        manager.process_events(event)
-
-    manager.update(time_delta)
-
-    if not paused:
-        if is_recording:
-            current_time = pygame.time.get_ticks()
-            if current_time - record_start_time >= RECORDING_DURATION:
-                stop_recording()
-                start_recording()
+                    new_orbit_settings.kill()
+                elif delete_button and event.ui_element == delete_button:
+                    with sim.lock:
+                        planets.remove(selected_planet)
+                    if selected_planet.bus:
+                        selected_planet.bus.close()
+                    if planet_info_popup:
+                        planet_info_popup.kill()
+                    selected_planet = None
+                    delete_button = None
+                    close_button = None
+                    gain_slider = None
+                    mute_button = None
+                    writer.save(update_settings_file, 'settings.ini', list(planets), sim.speed_multiplier, True, SUSTAIN_RELEASE_TIME)
+                elif mute_button and event.ui_element == mute_button:
+                    selected_planet.bus.set_mute(not selected_planet.bus.muted)
+                    mute_button.set_text("Unmute" if selected_planet.bus.muted else "Mute")
+                elif close_button and event.ui_element == close_button:
+                    if planet_info_popup:
+                        planet_info_popup.kill()
+                    selected_planet = None
+                    delete_button = None
+                    close_button = None
+                    gain_slider = None
+                    mute_button = None
+            elif event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
+                if event.ui_element == scrub_slider:
+                    sim.seek(event.value)
+                    if renderer.trails:
+                        renderer.trails.clear()
+                    scrub_label.set_text(format_playback_time(event.value))
+                elif gain_slider and event.ui_element == gain_slider:
+                    selected_planet.bus.set_gain(event.value)
+                elif event.ui_element == speed_slider:
+                    sim.speed_multiplier = event.value
+                    writer.save(update_settings_ini, 'settings.ini', sim.speed_multiplier, SUSTAIN_RELEASE_TIME)
+                elif event.ui_element == sustain_release_slider:
+                    SUSTAIN_RELEASE_TIME = event.value
+                    for planet in planets:
+                        planet.set_sustain_release(SUSTAIN_RELEASE_TIME)
+                    writer.save(update_settings_ini, 'settings.ini', sim.speed_multiplier, SUSTAIN_RELEASE_TIME)
+
+            manager.process_events(event)
+
+        # List new or changed scenes and apply the filter, but never under an open dropdown
+        if (library.version, scene_query, scene_limit) != shown_library and dropdown.current_state is dropdown.menu_states['closed']:
+            dropdown.kill()
+            dropdown = create_scene_dropdown(manager, library, scene_query, scene_limit, current_file)
+            shown_library = (library.version, scene_query, scene_limit)
+            if not scene_info.text:
+                scene_info.set_text(format_scene_info(library.metadata(current_file)))
+
+        manager.update(time_delta)
 
-    screen.fill(BLACK)
+        if not paused:
+            # Follow playback on the scrub bar once a second, unless it is being dragged
+            if sim.frames // 60 != shown_second and not pygame.mouse.get_pressed()[0]:
+                shown_second = sim.frames // 60
+                scrub_slider.set_current_value(min(shown_second, SCRUB_RANGE))
+                scrub_label.set_text(format_playback_time(shown_second))
 
-    # Draw the middle line
-    pygame.draw.line(screen, RED, (CENTER[0], 0), (CENTER[0], HEIGHT), 1)
+        screen.fill(BLACK)
 
-    # Draw orbit preview when in edit mode
-    if edit_mode and not adding_orbit:
-        preview_color = WHITE
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        
-        transformed_x = (mouse_x - CENTER[0]) / zoom_level + CENTER[0]
-        transformed_y = (mouse_y - CENTER[1]) / zoom_level + CENTER[1]
-        
-        vector_x = transformed_x - CENTER[0]
-        vector_y = transformed_y - CENTER[1]
-        
-        preview_radius = math.hypot(vector_x, vector_y)
-        
-        preview_points = []
-        for angle in range(0, 360, 5):
-            x = CENTER[0] + preview_radius * math.cos(math.radians(angle))
-            y = CENTER[1] + preview_radius * math.sin(math.radians(angle))
-            scaled_x = (x - CENTER[0]) * zoom_level + CENTER[0]
-            scaled_y = (y - CENTER[1]) * zoom_level + CENTER[1]
-            preview_points.append((scaled_x, scaled_y))
-        
-        pygame.draw.lines(screen, preview_color, True, preview_points, 1)
-
-    # Draw and update planets and moons
-    for planet in planets:
-        points = []
-        for angle in range(0, 360, 5):
-            r = planet.radius * (1 - planet.eccentricity**2) / (1 + planet.eccentricity * math.cos(math.radians(angle)))
-            x = CENTER[0] + int(r * math.cos(math.radians(angle) + planet.orbit_angle)) * zoom_level
-            y = CENTER[1] + int(r * math.sin(math.radians(angle) + planet.orbit_angle)) * zoom_level
-            points.append((x, y))
-        pygame.draw.lines(screen, PURPLE, True, points, 1)
+        # Draw the middle line
+        draw_trigger_lines(screen, sim.scene.triggers.lines)
 
-        if not paused:
-            planet.update(GLOBAL_SPEED_MULTIPLIER)
-        planet.draw(zoom_level)
+        # Draw orbit preview when in edit mode
+        if edit_mode and not adding_orbit:
+            preview_color = WHITE
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+
+            transformed_x = (mouse_x - CENTER[0]) / zoom_level + CENTER[0]
+            transformed_y = (mouse_y - CENTER[1]) / zoom_level + CENTER[1]
+
+            vector_x = transformed_x - CENTER[0]
+            vector_y = transformed_y - CENTER[1]
+
+            preview_radius = math.hypot(vector_x, vector_y)
 
-        for moon in planet.moons:
-            moon_points = []
-            planet_x, planet_y = planet.calculate_position()
+            preview_points = []
             for angle in range(0, 360, 5):
-                r = moon.radius * (1 - moon.eccentricity**2) / (1 + moon.eccentricity * math.cos(math.radians(angle)))
-                x = planet_x + int(r * math.cos(math.radians(angle) + moon.orbit_angle)) * zoom_level
-                y = planet_y + int(r * math.sin(math.radians(angle) + moon.orbit_angle)) * zoom_level
-                moon_points.append((x, y))
-            pygame.draw.lines(screen, BLUE, True, moon_points, 1)
+                x = CENTER[0] + preview_radius * math.cos(math.radians(angle))
+                y = CENTER[1] + preview_radius * math.sin(math.radians(angle))
+                scaled_x = (x - CENTER[0]) * zoom_level + CENTER[0]
+                scaled_y = (y - CENTER[1]) * zoom_level + CENTER[1]
+                preview_points.append((scaled_x, scaled_y))
 
-    # Draw center
-    pygame.draw.circle(screen, WHITE, CENTER, 5)
+            pygame.draw.lines(screen, preview_color, True, preview_points, 1)
 
-    # Draw "Edit Mode" text when paused
-    if edit_mode:
-        draw_edit_mode_text(screen, pulse_time)
+        # Update and draw planets and moons
+        if worker:
+            renderer.draw(screen, planets, zoom_level, worker.snapshot(planets))
+        else:
+            renderer.draw(screen, sim.planets, zoom_level)
 
-    # Update button color based on recording state
-    if is_recording:
-        record_button.colours['normal_bg'] = pygame.Color('red')
-        record_button.colours['hovered_bg'] = pygame.Color('darkred')
-        record_button.colours['active_bg'] = pygame.Color('darkred')
-    else:
-        record_button.colours['normal_bg'] = pygame.Color('#45494e')
-        record_button.colours['hovered_bg'] = pygame.Color('#35393e')
-        record_button.colours['active_bg'] = pygame.Color('#35393e')
-    record_button.rebuild()
+        # Draw center
+        pygame.draw.circle(screen, WHITE, CENTER, 5)
 
-    manager.draw_ui(screen)
+        # Draw "Edit Mode" text when paused
+        if edit_mode:
+            draw_edit_mode_text(screen, text_cache, pulse_time)
 
-    pygame.display.flip()
+        # Update button color when the recording state changes
+        if recorder.is_recording != shown_recording:
+            set_record_colours(record_button, recorder.is_recording)
+            shown_recording = recorder.is_recording
+
+        manager.draw_ui(screen)
+
+        pygame.display.flip()
+
+    # Clean up
+    await runtime.stop()
+    await writer.close()
+    if worker:
+        worker.stop()
+    library.stop()
+    preloader.shutdown()
+    audio.stop()
+    pygame.quit()
 
-# Clean up
-s.stop()
-pygame.quit()
+if __name__ == "__main__":
+    Runtime().run(main)
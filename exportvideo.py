@@ -0,0 +1,186 @@
+import argparse
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # nothing is shown, so no window is needed
+import pygame
+
+from orbitcore import BLACK, CENTER, HEIGHT, WHITE, WIDTH
+from orbitcore.audio import LIMIT_LOOKAHEAD, PyoAudio
+from orbitcore.constants import FRAME_RATE
+from orbitcore.display import draw_trigger_lines
+from orbitcore.preload import load_scene
+from orbitcore.render import SceneRenderer
+from orbitcore.simulation import Simulation
+from orbitcore.trails import add_trail_arguments, trails_from_args
+
+EXPORT_SAMPLE_RATE = 48000
+# Small blocks, so every note starts within a block of its crossing
+EXPORT_BUFFER_SIZE = 64
+# Blocks between a note being scheduled and reaching the limiter: pyo starts it on the next block,
+# then each of the planet, scene and master bus mixers holds it for one more
+SCHEDULE_BLOCKS = 4
+# Image formats for --frames. PNG files are small but slow to encode; run-length encoded TGA files
+# encode about five times faster, which keeps exports on one or two cores faster than real time
+FRAME_FORMATS = ['png', 'tga']
+
+def draw_frame(surface, renderer, scene, zoom_level):
+    # The demo picture without the GUI
+    surface.fill(BLACK)
+    draw_trigger_lines(surface, scene.triggers.lines)
+    renderer.draw(surface, scene.planets, zoom_level)
+    pygame.draw.circle(surface, WHITE, CENTER, 5)
+
+def trim_wav(source, target, frames):
+    # Copies `source` to `target` without its first `frames` sample frames
+    with wave.open(source, 'rb') as src, wave.open(target, 'wb') as dst:
+        dst.setparams(src.getparams())
+        src.setpos(min(frames, src.getnframes()))
+        while True:
+            data = src.readframes(65536)
+            if not data:
+                break
+            dst.writeframes(data)
+
+def save_frame(path, data, size):
+    # Image encoding is most of the export time, so it runs in worker processes
+    pygame.image.save(pygame.image.frombytes(data, size, 'RGB'), path)
+
+class FrameWriter:
+    # Numbered images in `frames_dir`, or raw frames piped to ffmpeg when writing `video`
+    def __init__(self, frames_dir=None, video=None, fps=FRAME_RATE, size=(WIDTH, HEIGHT), workers=None, frame_format='png'):
+        self.frames_dir = frames_dir
+        self.frame_format = frame_format
+        self.size = size
+        self.count = 0
+        self.process = None
+        self.executor = None
+        self.pending = collections.deque()
+        if frames_dir:
+            os.makedirs(frames_dir, exist_ok=True)
+            self.workers = workers or os.cpu_count() or 1
+            # With one core, handing every frame to another process only adds copying
+            if self.workers > 1:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        if video:
+            self.video = video
+            self.process = subprocess.Popen(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                 '-s', f'{size[0]}x{size[1]}', '-r', str(fps), '-i', '-',
+                 '-c:v', 'libx264', '-pix_fmt', 'yuv420p', video],
+                stdin=subprocess.PIPE)
+
+    def write(self, surface):
+        data = pygame.image.tobytes(surface, 'RGB') if self.executor or self.process else None
+        if self.frames_dir:
+            path = os.path.join(self.frames_dir, f'frame_{self.count:06d}.{self.frame_format}')
+            if self.executor:
+                self.pending.append(self.executor.submit(save_frame, path, data, self.size))
+                # A couple of frames per worker in flight keeps them busy without holding the whole export in memory
+                while len(self.pending) > 2 * self.workers:
+                    self.pending.popleft().result()
+            else:
+                pygame.image.save(surface, path)
+        if self.process:
+            self.process.stdin.write(data)
+        self.count += 1
+
+    def close(self):
+        if self.executor:
+            for future in self.pending:
+                future.result()
+            self.executor.shutdown()
+        if self.process:
+            self.process.stdin.close()
+            if self.process.wait():
+                raise RuntimeError(f"ffmpeg failed writing {self.video}")
+
+def mux(video, audio_file, output):
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', video, '-i', audio_file,
+                    '-c:v', 'copy', '-c:a', 'aac', '-shortest', output], check=True)
+
+def export(settings_file, duration, fps=FRAME_RATE, audio_file='export.wav', frames_dir=None, video=None,
+           zoom_level=1.0, workers=None, trails=None, frame_format='png'):
+    # Steps the simulation tick by tick and renders the audio in step with it on a manual pyo server,
+    # so nothing depends on how fast this machine is. Frames are drawn at `fps` from the latest tick.
+    audio = PyoAudio(audio='manual', sr=EXPORT_SAMPLE_RATE, buffersize=EXPORT_BUFFER_SIZE, duplex=0)
+    server = audio.server
+    sim = Simulation(load_scene(settings_file, audio))
+
+    raw_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
+    video_only = tempfile.NamedTemporaryFile(suffix=os.path.splitext(video)[1], delete=False).name if video else None
+    server.recordOptions(dur=-1, filename=raw_audio, fileformat=0, sampletype=1)
+    server.recstart()
+
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    renderer = SceneRenderer(trails=trails)
+    writer = FrameWriter(frames_dir, video_only, fps, workers=workers, frame_format=frame_format)
+    ticks = round(duration * FRAME_RATE)
+    rendered = 0
+    try:
+        for tick in range(ticks + 1):
+            # Every frame due before this tick shows the scene as the previous tick left it
+            while writer.count * FRAME_RATE < tick * fps:
+                draw_frame(surface, renderer, sim.scene, zoom_level)
+                writer.write(surface)
+            if tick == ticks:
+                break
+            # Audio is rendered up to the start of the tick before it is simulated, so a crossing
+            # `offset` into the tick, played `offset` of a tick late, lands at the moment it happened
+            while rendered < tick * EXPORT_SAMPLE_RATE / FRAME_RATE:
+                server.process()
+                rendered += EXPORT_BUFFER_SIZE
+            sim.tick(tick * 1000 / FRAME_RATE)
+        # Render what is still held back at the end, which is trimmed from the start below
+        while rendered < (ticks / FRAME_RATE + LIMIT_LOOKAHEAD / 1000) * EXPORT_SAMPLE_RATE + SCHEDULE_BLOCKS * EXPORT_BUFFER_SIZE:
+            server.process()
+            rendered += EXPORT_BUFFER_SIZE
+    finally:
+        server.recstop()
+        audio.stop()
+        writer.close()
+
+    # Dropping the scheduling blocks and the limiter lookahead from the start lines the audio up with the frames
+    trim_wav(raw_audio, audio_file, int(LIMIT_LOOKAHEAD / 1000 * EXPORT_SAMPLE_RATE) + SCHEDULE_BLOCKS * EXPORT_BUFFER_SIZE)
+    os.remove(raw_audio)
+    if video:
+        mux(video_only, audio_file, video)
+        os.remove(video_only)
+    return writer.count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a Polyorbit scene to frames or video and a matching WAV, faster than real time.")
+    parser.add_argument('settings', nargs='?', default='settings.ini')
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds to export")
+    parser.add_argument('--fps', type=float, default=FRAME_RATE, help="frames per second of the export")
+    parser.add_argument('--audio', default='export.wav', help="WAV file to write")
+    parser.add_argument('--frames', help="directory for an image sequence")
+    parser.add_argument('--frame-format', choices=FRAME_FORMATS, default='png',
+                        help="image format for --frames; tga is much faster to write on few cores (default: png)")
+    parser.add_argument('--video', help="video file to write with the audio muxed in, needs ffmpeg")
+    parser.add_argument('--zoom', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, help="processes encoding frame images (default: one per CPU)")
+    add_trail_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.frames and not args.video:
+        parser.error("give --frames, --video or both")
+    if args.video and not shutil.which('ffmpeg'):
+        parser.error("--video needs ffmpeg on the PATH; use --frames for an image sequence instead")
+
+    pygame.init()
+    start = time.perf_counter()
+    frames = export(args.settings, args.duration, args.fps, args.audio, args.frames, args.video, args.zoom,
+                    args.workers, trails_from_args(args), args.frame_format)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {frames} frames and {args.duration:.1f} s of audio in {elapsed:.1f} s "
+          f"({args.duration / elapsed:.1f}x real time)")
+    for output in [args.frames, args.video, args.audio]:
+        if output:
+            print(f"  {output}")
@@ -2,27 +2,7 @@ import configparser
 import random
 import math
 
-# Define scales (3 octaves each where applicable)
-SCALES = {
-    "C Major": [131, 147, 165, 175, 196, 220, 247, 261, 293, 329, 349, 392, 440, 493, 523, 587, 659, 698, 784, 880, 987],
-    "C Natural Minor": [131, 147, 156, 175, 196, 208, 247, 261, 293, 311, 349, 392, 415, 493, 523, 587, 622, 698, 784, 831, 987],
-    "C Harmonic Minor": [131, 147, 156, 175, 196, 208, 247, 261, 293, 311, 349, 392, 440, 493, 523, 587, 622, 698, 784, 880, 987],
-    "C Melodic Minor": [131, 147, 156, 175, 196, 220, 247, 261, 293, 311, 349, 392, 440, 493, 523, 587, 622, 698, 784, 880, 987],
-    "C Blues": [131, 156, 175, 185, 196, 233, 261, 311, 349, 370, 392, 466, 523, 622, 698, 740, 784, 932],
-    "C Pentatonic Major": [131, 147, 165, 196, 220, 261, 293, 329, 392, 440, 523, 587, 659, 784, 880],
-    "C Pentatonic Minor": [131, 156, 175, 196, 233, 261, 311, 349, 392, 466, 523, 622, 698, 784, 932],
-    "C Dorian": [131, 147, 156, 175, 196, 220, 233, 261, 293, 311, 349, 392, 440, 466, 523, 587, 622, 698, 784, 880, 932],
-    "C Phrygian": [131, 139, 165, 175, 196, 208, 247, 261, 277, 329, 349, 392, 415, 493, 523, 554, 659, 698, 784, 831, 987],
-    "C Lydian": [131, 147, 165, 185, 196, 220, 247, 261, 293, 329, 370, 392, 440, 493, 523, 587, 659, 740, 784, 880, 987],
-    "C Mixolydian": [131, 147, 165, 175, 196, 220, 233, 261, 293, 329, 349, 392, 440, 466, 523, 587, 659, 698, 784, 880, 932],
-    "C Locrian": [131, 139, 165, 175, 185, 208, 247, 261, 277, 329, 349, 370, 415, 493, 523, 554, 659, 698, 740, 831, 987],
-    "C Whole Tone": [131, 147, 165, 185, 208, 233, 261, 293, 329, 370, 415, 466, 523, 587, 659, 740, 831, 932],
-    "C Diminished": [131, 147, 156, 175, 185, 208, 220, 247, 261, 293, 311, 349, 370, 415, 440, 493, 523, 587, 622, 698, 740, 831, 880, 987],
-    "C Augmented": [131, 147, 165, 185, 208, 233, 261, 293, 329, 370, 415, 466, 523, 587, 659, 740, 831, 932],
-    "C Bebop Dominant": [131, 147, 165, 175, 196, 220, 233, 247, 261, 293, 329, 349, 392, 440, 466, 493, 523, 587, 659, 698, 784, 880, 932, 987],
-    "C Bebop Major": [131, 147, 165, 175, 196, 208, 220, 247, 261, 293, 329, 349, 392, 415, 440, 493, 523, 587, 659, 698, 784, 831, 880, 987],
-    "C Altered": [131, 139, 165, 175, 185, 208, 233, 261, 277, 329, 349, 370, 415, 466, 523, 554, 659, 698, 740, 831, 932],
-}
+from orbitcore.scales import SCALES, get_frequency_in_key
 
 def get_user_input():
     while True:
@@ -65,6 +45,15 @@ def get_user_input():
                         print("Invalid selection. Please choose a number from the list.")
                 except ValueError:
                     print("Please enter a valid number.")
+
+            # With a rhythm ratio, distances are solved so the scene loops exactly instead of picked at random
+            rhythm = input("Target rhythm ratio for an exactly looping scene, e.g. 3:4:5:7 (leave empty for random distances): ").strip()
+            if rhythm:
+                from orbitcore.ratios import parse_ratio
+                rhythm = parse_ratio(rhythm)
+                max_cycle = float(input("Longest time before the scene repeats, in seconds (e.g. 60): "))
+            else:
+                rhythm, max_cycle = None, None
             
             if (min_planets <= 0 or max_planets <= 0 or min_planets > max_planets or
                 min_moons < 0 or max_moons < 0 or min_moons > max_moons or
@@ -75,33 +64,29 @@ def get_user_input():
             return (min_planets, max_planets, min_moons, max_moons, min_center_distance, 
                     min_planet_distance, random_distance, 
                     min_planet_separation if random_distance else fixed_planet_separation,
-                    speed_multiplier, elliptical_orbits, max_eccentricity, selected_scale)
+                    speed_multiplier, elliptical_orbits, max_eccentricity, selected_scale, rhythm, max_cycle)
         except ValueError:
             print("Please enter valid values.")
 
-def get_frequency_in_key(size, is_planet, has_moons, scale):
-    scale_frequencies = SCALES[scale]
-    
-    if is_planet:
-        inverted_size = 50 - size + 20
-        if has_moons:
-            index = (inverted_size - 20) * 14 // 30
-        else:
-            index = ((inverted_size - 20) * 14 // 30) + 7
-        return scale_frequencies[min(max(index, 0), len(scale_frequencies) - 1)]
-    else:
-        inverted_size = 16 - size
-        index = ((inverted_size - 1) * 7 // 14) + 14
-        return scale_frequencies[min(max(index, 14), len(scale_frequencies) - 1)]
-
 def generate_random_settings(file_name='settings.ini'):
     (min_planets, max_planets, min_moons, max_moons, min_center_distance, 
      min_planet_distance, random_distance, distance_parameter,
-     speed_multiplier, elliptical_orbits, max_eccentricity, selected_scale) = get_user_input()
+     speed_multiplier, elliptical_orbits, max_eccentricity, selected_scale, rhythm, max_cycle) = get_user_input()
     
     config = configparser.ConfigParser()
     
     num_planets = random.randint(min_planets, max_planets)
+    moon_sizes = [[random.randint(1, 15) for _ in range(random.randint(min_moons, max_moons))] for _ in range(num_planets)]
+    if rhythm:
+        from orbitcore.ratios import cycle_seconds, max_cycle_distance, solve_scene
+        solved = solve_scene(rhythm, moon_sizes, min_center_distance, min_planet_distance, distance_parameter,
+                             max_cycle_distance(max_cycle, speed_multiplier))
+        if solved is None:
+            print(f"No layout for {num_planets} planets repeats within {max_cycle:g} seconds. "
+                  "Try a longer cycle, fewer planets or moons, or smaller distances.")
+            return False
+        cycle_distance, planet_distances, moon_distances = solved
+        print(f"The scene repeats every {cycle_seconds(cycle_distance, speed_multiplier):.2f} seconds.")
     config['Global'] = {
         'NumberOfPlanets': str(num_planets),
         'SpeedMultiplier': str(speed_multiplier),
@@ -114,11 +99,13 @@ def generate_random_settings(file_name='settings.ini'):
     for i in range(1, num_planets + 1):
         planet_section = f'Planet{i}'
         size = random.randint(20, 50)
-        num_moons = random.randint(min_moons, max_moons)
+        num_moons = len(moon_sizes[i - 1])
         has_moons = num_moons > 0
         frequency = get_frequency_in_key(size, True, has_moons, selected_scale)
         
-        if random_distance:
+        if rhythm:
+            distance = planet_distances[i - 1]
+        elif random_distance:
             distance = previous_planet_distance + random.randint(distance_parameter, distance_parameter + 50)
         else:
             distance = previous_planet_distance + distance_parameter
@@ -142,9 +129,12 @@ def generate_random_settings(file_name='settings.ini'):
         previous_moon_distance = min_planet_distance
         for j in range(1, num_moons + 1):
             moon_section = f'{planet_section}Moon{j}'
-            moon_size = random.randint(1, 15)
+            moon_size = moon_sizes[i - 1][j - 1]
             moon_frequency = get_frequency_in_key(moon_size, False, True, selected_scale)
-            moon_distance = previous_moon_distance + random.randint(moon_size, 20)
+            if rhythm:
+                moon_distance = moon_distances[i - 1][j - 1]
+            else:
+                moon_distance = previous_moon_distance + random.randint(moon_size, 20)
             previous_moon_distance = moon_distance
             moon_sound_file = ""
 
@@ -162,7 +152,8 @@ def generate_random_settings(file_name='settings.ini'):
 
     with open(file_name, 'w') as configfile:
         config.write(configfile)
+    return True
 
 if __name__ == "__main__":
-    generate_random_settings()
-    print("Random settings.ini file has been generated.")
+    if generate_random_settings():
+        print("Random settings.ini file has been generated.")
@@ -0,0 +1,86 @@
+import argparse
+import numpy as np
+
+from orbitcore import Planet, read_audio_settings
+from orbitcore.audio import LIMIT_LOOKAHEAD, PyoAudio, add_audio_arguments, audio_options
+from orbitcore.constants import FRAME_RATE
+
+# Seconds between measured notes, long enough for each one to die away before the next
+SPACING = 0.5
+# Smallest output sample that counts as sound
+ONSET_LEVEL = 1e-7
+
+def measure_latency(options, triggers=100, seed=None):
+    # Runs the real trigger path offline: a manual pyo server with the profile's sample rate and buffer
+    # size renders block by block, the way the audio thread would, while a 60 Hz tick at a random phase
+    # to the audio clock triggers a planet at a random point of the tick it is simulating.
+    # Returns the server and the latency of every note in seconds, from the moment its crossing
+    # happened to its first sample leaving the limiter.
+    from pyo import NewTable, TableRec
+
+    rng = np.random.default_rng(seed)
+    audio = PyoAudio(**dict(options, audio='manual'))
+    server = audio.server
+    sample_rate, buffer_size = server.getSamplingRate(), server.getBufferSize()
+    planet = Planet(100, 1, 440, 0, 0, 0.05, audio=audio)
+
+    tick = 1 / FRAME_RATE
+    length = (triggers + 1) * SPACING + 1
+    table = NewTable(length, chnls=1)
+    recorder = TableRec(audio.limiter, table).play()
+
+    rendered = 0
+    phase = rng.random() * tick
+    crossings = []
+    for n in range(triggers):
+        # The tick that finds the crossing ends at `now`; by then every block starting before it has been rendered
+        now = phase + round((n + 1) * SPACING * FRAME_RATE) * tick
+        while rendered < now * sample_rate:
+            server.process()
+            rendered += buffer_size
+        offset = rng.random()
+        crossings.append(now - tick + offset * tick)
+        planet.trigger(offset)
+    while rendered < length * sample_rate:
+        server.process()
+        rendered += buffer_size
+    recorder.stop()
+
+    samples = np.abs(np.asarray(table.getTable()))
+    latencies = []
+    for crossing in crossings:
+        start = int(crossing * sample_rate)
+        sounding = np.flatnonzero(samples[start:start + int(SPACING * sample_rate)] > ONSET_LEVEL)
+        if len(sounding):
+            latencies.append((start + sounding[0]) / sample_rate - crossing)
+    audio.stop()
+    return server, np.array(latencies)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure trigger-to-output latency and jitter of an audio profile, offline.")
+    parser.add_argument('settings', nargs='?', default='settings.ini', help="settings file whose [Audio] section to use")
+    parser.add_argument('--triggers', type=int, default=100, help="number of notes to measure")
+    parser.add_argument('--seed', type=int)
+    add_audio_arguments(parser)
+    args = parser.parse_args()
+
+    settings = read_audio_settings(args.settings)
+    options = audio_options(args, settings)
+    profile = args.audio_profile or settings['profile'] or 'default'
+    server, latencies = measure_latency(options, args.triggers, args.seed)
+    sample_rate, buffer_size = server.getSamplingRate(), server.getBufferSize()
+    buffer_ms = buffer_size / sample_rate * 1000
+
+    print(f"Profile: {profile} ({sample_rate:.0f} Hz, {buffer_size} samples = {buffer_ms:.2f} ms per buffer)")
+    if not len(latencies):
+        parser.exit(1, "No notes reached the output\n")
+    ms = latencies * 1000
+    print(f"Notes measured: {len(ms)} of {args.triggers}")
+    print(f"Crossing to output: mean {ms.mean():.2f} ms, min {ms.min():.2f} ms, max {ms.max():.2f} ms")
+    print(f"Jitter: {ms.std():.2f} ms standard deviation, {ms.max() - ms.min():.2f} ms peak to peak")
+    # pyo starts a note on a buffer boundary after the buffer it was scheduled in, so the rest grows and
+    # jitters with the buffer size
+    fixed = 1000 / FRAME_RATE + LIMIT_LOOKAHEAD
+    print(f"  {1000 / FRAME_RATE:.2f} ms of it is the tick every note is held back by, {LIMIT_LOOKAHEAD:.2f} ms the limiter "
+          f"lookahead and {ms.mean() - fixed:.2f} ms ({(ms.mean() - fixed) / buffer_ms:.1f} buffers) buffer quantisation")
+    print(f"The sound card adds its own output latency on top, at least one more buffer ({buffer_ms:.2f} ms)")
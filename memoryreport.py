@@ -0,0 +1,54 @@
+import argparse
+import tracemalloc
+import numpy as np
+
+from orbitcore.arrays import SceneArrays
+from orbitcore.bodies import MAX_TRIGGER_RATE
+from orbitcore.lines import DEFAULT_TRIGGER
+from orbitcore.settings import SUSTAIN_RELEASE_TIME, build_planets, read_scene
+
+def synthetic_scene(count, moons_per_planet=9, seed=0):
+    # A read_scene style scene of `count` bodies, each planet followed by its moons
+    rng = np.random.default_rng(seed)
+    bodies = []
+    while len(bodies) < count:
+        planet = len(bodies)
+        bodies.append({'parent': None, 'radius': int(rng.integers(50, 1000)), 'size': int(rng.integers(5, 20)),
+                       'frequency': float(rng.uniform(100, 1000)), 'eccentricity': 0.0, 'orbit_angle': 0.0,
+                       'sound_file': None, 'gain': 1.0, 'muted': False})
+        for _ in range(min(moons_per_planet, count - len(bodies))):
+            bodies.append({'parent': planet, 'radius': int(rng.integers(10, 50)), 'size': int(rng.integers(1, 5)),
+                           'frequency': float(rng.uniform(100, 1000)), 'eccentricity': 0.0, 'orbit_angle': 0.0,
+                           'sound_file': None, 'gain': 1.0, 'muted': False})
+    return {'bodies': bodies, 'max_trigger_rate': MAX_TRIGGER_RATE, 'triggers': [DEFAULT_TRIGGER]}
+
+def traced(build):
+    # What `build()` returns and the bytes it allocated and still holds
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, held
+
+def memory_report(scene):
+    # Bytes per body of the body objects (no audio) and of the arrays the batch renderer keeps
+    count = len(scene['bodies'])
+    planets, bodies_bytes = traced(lambda: build_planets(scene, SUSTAIN_RELEASE_TIME))
+    arrays, arrays_bytes = traced(lambda: SceneArrays(planets))
+    return count, bodies_bytes, arrays_bytes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the memory a scene's bodies take, without audio.")
+    parser.add_argument('settings', nargs='?', help="settings file to measure (default: a generated scene)")
+    parser.add_argument('--bodies', type=int, default=100000, help="size of the generated scene")
+    args = parser.parse_args()
+
+    scene = read_scene(args.settings) if args.settings else synthetic_scene(args.bodies)
+    count, bodies_bytes, arrays_bytes = memory_report(scene)
+    if not count:
+        parser.exit(1, "No bodies\n")
+    print(f"Scene: {args.settings or f'generated, {count} bodies'}")
+    print(f"Bodies:       {bodies_bytes / 2**20:8.1f} MiB, {bodies_bytes / count:6.0f} bytes per body")
+    print(f"Render arrays:{arrays_bytes / 2**20:8.1f} MiB, {arrays_bytes / count:6.0f} bytes per body")
+    print("Audio adds a voice (pyo oscillator and envelope) per body on top of this")
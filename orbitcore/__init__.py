@@ -0,0 +1,7 @@
+# Orbit model, scales and settings I/O shared by the demos and tools.
+# Importing this package never opens a window or an audio device: pygame lives in
+# orbitcore.display and pyo is imported lazily by orbitcore.audio.
+from .bodies import CelestialBody, Moon, Planet
+from .constants import BLACK, BLUE, CENTER, FRAME_MS, FRAME_RATE, HEIGHT, PURPLE, RED, WHITE, WIDTH
+from .scales import SCALES, get_frequency_in_key, get_frequency_in_scale
+from .settings import SUSTAIN_RELEASE_TIME, build_planets, load_settings, read_audio_settings, read_scene, update_settings_file, update_settings_ini
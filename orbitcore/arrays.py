@@ -0,0 +1,55 @@
+import numpy as np
+
+from .constants import CENTER
+
+def scene_key(planets):
+    # Changes whenever bodies are added or removed, or a different scene is playing
+    return id(planets), sum(len(planet.family()) for planet in planets)
+
+class SceneArrays:
+    # Per-body values that only change when bodies are added or removed, each planet followed by
+    # everything orbiting it, every body after the one it orbits
+    def __init__(self, planets):
+        self.bodies = []
+        parents = []
+        depths = []
+        for planet in planets:
+            index = {}
+            for body in planet.family():
+                parent = index[id(body.planet)] if body is not planet else -1
+                index[id(body)] = len(self.bodies)
+                self.bodies.append(body)
+                parents.append(parent)
+                depths.append(depths[parent] + 1 if parent >= 0 else 0)
+
+        self.key = scene_key(planets)
+        self.parents = np.array(parents, dtype=np.intp)
+        self.is_moon = self.parents >= 0
+        # Moons grouped by how deep they sit, so positions can be summed one level at a time
+        depths = np.array(depths, dtype=np.intp)
+        self.levels = [np.nonzero(depths == depth)[0] for depth in range(1, depths.max() + 1)] if len(depths) else []
+        self.radius = np.array([body.radius for body in self.bodies], dtype=float)
+        self.size = np.array([body.size for body in self.bodies], dtype=float)
+        self.eccentricity = np.array([body.eccentricity for body in self.bodies], dtype=float)
+        self.orbit_angle = np.array([body.orbit_angle for body in self.bodies], dtype=float)
+
+    def positions(self):
+        # Same maths and pixel snapping as calculate_position, for every body at once
+        angle = self.state('angle', float)
+        r = self.radius * (1 - self.eccentricity**2) / (1 + self.eccentricity * np.cos(angle))
+        x = np.trunc(r * np.cos(angle + self.orbit_angle))
+        y = np.trunc(r * np.sin(angle + self.orbit_angle))
+        for level in self.levels:
+            x[level] += x[self.parents[level]]
+            y[level] += y[self.parents[level]]
+        return x + CENTER[0], y + CENTER[1]
+
+    def glows(self):
+        return self.state('glow', int)
+
+    def state(self, name, dtype):
+        # Every body's angle or glow, straight from the TriggerLines playing these bodies when there is one
+        owner = self.bodies[0].column[0] if self.bodies and self.bodies[0].column else None
+        if owner is not None and owner.arrays is not None and owner.arrays.key == self.key:
+            return getattr(owner, name).astype(dtype)
+        return np.fromiter((getattr(body, name) for body in self.bodies), dtype=dtype, count=len(self.bodies))
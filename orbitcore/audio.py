@@ -0,0 +1,338 @@
+import logging
+import os
+import threading
+import time
+
+# pyo is only imported once something actually needs sound, so the orbit model can be used
+# from tests, analysis and batch tools without opening an audio device.
+
+log = logging.getLogger(__name__)
+
+# Audio thread load at which each degradation step kicks in, in this order
+SHED_THRESHOLDS = [0.6, 0.75, 0.9]
+SHED_STEPS = ['thin moon triggers', 'short release tails', 'drop quiet voices']
+# A step is only undone once the load is this far back below its threshold
+SHED_HYSTERESIS = 0.1
+# Seconds between two step changes, so one spike does not walk through every step at once
+SHED_HOLD = 1.0
+MAX_VOICES = 64
+MOON_TRIGGERS_PER_TICK = 4
+SHORT_RELEASE = 0.25  # share of the release tail kept while tails are shortened
+
+# Master limiter: anything above LIMIT_THRESHOLD dBFS is held down, seen LIMIT_LOOKAHEAD ms ahead.
+# Its detector is not sample exact, so whatever still gets past is clipped at LIMIT_CEILING.
+LIMIT_THRESHOLD = -1.0
+LIMIT_LOOKAHEAD = 10.0
+LIMIT_CEILING = 0.99
+
+# pyo Server options per audio profile. 'default' leaves everything to pyo (256 samples, duplex);
+# 'safe' trades latency for headroom on busy or slow machines, 'low-latency' the other way round.
+PROFILES = {
+    'default': {},
+    'safe': {'sr': 44100, 'buffersize': 1024, 'duplex': 0},
+    'low-latency': {'sr': 48000, 'buffersize': 64, 'duplex': 0},
+}
+
+def server_options(profile=None, **overrides):
+    # Server keyword arguments for `profile`, with every override that is not None on top
+    if profile and profile not in PROFILES:
+        raise ValueError(f"unknown audio profile {profile!r}, expected one of {', '.join(PROFILES)}")
+    options = dict(PROFILES[profile or 'default'])
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return options
+
+def add_audio_arguments(parser):
+    parser.add_argument('--audio-profile', choices=list(PROFILES), help="audio server profile (default: Profile in [Audio] of settings.ini, else default)")
+    parser.add_argument('--buffer-size', type=int, help="samples per audio buffer, overrides the profile")
+    parser.add_argument('--sample-rate', type=int, help="overrides the profile")
+    parser.add_argument('--audio-backend', help="pyo audio host, e.g. portaudio, jack or coreaudio")
+
+def audio_options(args, settings):
+    # The command line wins over the [Audio] section from settings.read_audio_settings, which wins over the profile
+    return server_options(args.audio_profile or settings['profile'],
+                          sr=args.sample_rate or settings['sr'],
+                          buffersize=args.buffer_size or settings['buffersize'],
+                          audio=args.audio_backend or settings['audio'],
+                          duplex=settings['duplex'])
+
+class LoadMonitor:
+    # Measures how busy pyo's audio thread is and how many voices are sounding, and steps
+    # through SHED_STEPS while the load stays too high. Voices ask allow() before playing.
+    def __init__(self, max_voices=MAX_VOICES, thresholds=SHED_THRESHOLDS):
+        self.max_voices = max_voices
+        self.thresholds = thresholds
+        self.load = 0.0
+        self.level = 0
+        self.changed_at = 0
+        self.sounding = []  # (end time, voice) for every note still ringing
+        self.shed = 0
+        self.moon_window = 0
+        self.moon_count = 0
+        self.last_wall = None
+        self.last_cpu = 0
+        self.lock = threading.Lock()
+
+    def measure(self):
+        # pyo calls this from the audio thread before every buffer, so the CPU time that thread
+        # used between two calls, over the wall time between them, is its load
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if self.last_wall is not None and wall > self.last_wall:
+            sample = (cpu - self.last_cpu) / (wall - self.last_wall)
+            self.load += 0.05 * (min(sample, 1.0) - self.load)
+        self.last_wall, self.last_cpu = wall, cpu
+
+    @property
+    def voice_count(self):
+        return len(self.sounding)
+
+    @property
+    def step(self):
+        return SHED_STEPS[self.level - 1] if self.level else None
+
+    def update(self):
+        now = time.perf_counter()
+        with self.lock:
+            self.sounding = [(end, voice) for end, voice in self.sounding if end > now]
+            if self.level >= 3 and len(self.sounding) > self.max_voices:
+                # Cut the quietest voices still ringing from before the cap applied
+                self.sounding.sort(key=lambda sounding: sounding[1].size, reverse=True)
+                for end, voice in self.sounding[self.max_voices:]:
+                    voice.env.stop()
+                    self.shed += 1
+                del self.sounding[self.max_voices:]
+        if now - self.changed_at < SHED_HOLD:
+            return
+
+        level = self.level
+        if level < len(self.thresholds) and self.load > self.thresholds[level]:
+            level += 1
+        elif level > 0 and self.load < self.thresholds[level - 1] - SHED_HYSTERESIS:
+            level -= 1
+        if level != self.level:
+            log.info("Audio load %d%%, %d voices: %s %s", self.load * 100, self.voice_count,
+                     'now' if level > self.level else 'no longer',
+                     SHED_STEPS[max(level, self.level) - 1])
+            self.level = level
+            self.changed_at = now
+
+    def allow(self, voice, delay, length):
+        # Whether `voice` may play now; also records it as sounding for `length` seconds
+        now = time.perf_counter()
+        with self.lock:
+            if self.level >= 1 and voice.moon:
+                if now - self.moon_window > 1 / 60:
+                    self.moon_window, self.moon_count = now, 0
+                if self.moon_count >= MOON_TRIGGERS_PER_TICK:
+                    self.shed += 1
+                    return False
+                self.moon_count += 1
+
+            if self.level >= 3 and len(self.sounding) >= self.max_voices:
+                # Make room by cutting the quietest voice, unless the new one is quieter still
+                quietest = min(range(len(self.sounding)), key=lambda i: self.sounding[i][1].size)
+                if self.sounding[quietest][1].size >= voice.size:
+                    self.shed += 1
+                    return False
+                self.sounding.pop(quietest)[1].env.stop()
+                self.shed += 1
+
+            self.sounding.append((now + delay + length, voice))
+            return True
+
+class PyoAudio:
+    # Every voice reaches the output through a tree of buses: moons into their planet's bus,
+    # planets into their scene's bus, scenes into the master bus, which is limited and is the
+    # only object sent to the output.
+    def __init__(self, **server_options):
+        self.server_options = server_options
+        self.monitor = LoadMonitor()
+        self._server = None
+        self.master = None
+
+    @property
+    def server(self):
+        if self._server is None:
+            from pyo import Clip, Compress, Server
+            self._server = Server(**self.server_options).boot()
+            self._server.setCallback(self.monitor.measure)
+            self.master = PyoBus(monitor=self.monitor)
+            limiter = Compress(self.master.output, thresh=LIMIT_THRESHOLD, ratio=100, risetime=0.0005,
+                               falltime=0.1, lookahead=LIMIT_LOOKAHEAD, knee=0)
+            self.limiter = Clip(limiter, -LIMIT_CEILING, LIMIT_CEILING)
+            self.output = self.limiter.mix(2).out()
+            self._server.start()
+        return self._server
+
+    def boot(self):
+        # Boots the server now rather than on first use, e.g. on another thread while the window opens
+        self.server
+        return self
+
+    def create_voice(self, frequency, size, sustain_release_time, sound_file=None):
+        self.server  # pyo objects need a booted server
+        return self.master.create_voice(frequency, size, sustain_release_time, sound_file)
+
+    def planet_bus(self):
+        self.server
+        return self.master.planet_bus()
+
+    def bus(self, level=1.0):
+        self.server
+        return PyoBus(self.master, level, self.monitor)
+
+    def recstart(self, filename):
+        self.server.recstart(filename)
+
+    def recstop(self):
+        self.server.recstop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.stop()
+
+class PyoBus:
+    # Sums voices and other buses into one stream with its own gain and mute, and feeds that
+    # into `parent`. Scenes use one to fade in and out as a whole, planets one for their moons.
+    # It can stand in for the audio backend when building bodies.
+    def __init__(self, parent=None, level=1.0, monitor=None):
+        from pyo import Mixer, SigTo
+
+        self.mixer = Mixer(outs=1, chnls=1, time=0.025)
+        self.gain = SigTo(level, time=0.05, init=level)
+        self.output = self.mixer[0] * self.gain
+        self.parent = parent
+        self.level = level
+        self.muted = False
+        self.monitor = monitor
+        self.voices = []
+        self.buses = []
+        self.inputs = 0
+        self.key = parent.add(self.output) if parent else None
+
+    def add(self, source):
+        self.inputs += 1
+        self.mixer.addInput(self.inputs, source)
+        self.mixer.setAmp(self.inputs, 0, 1)
+        return self.inputs
+
+    def remove(self, key):
+        self.mixer.delInput(key)
+
+    def create_voice(self, frequency, size, sustain_release_time, sound_file=None, gain=1.0, transpose=0.0):
+        voice = PyoVoice(frequency, size, sustain_release_time, sound_file, self, self.monitor, gain, transpose)
+        self.voices.append(voice)
+        return voice
+
+    def planet_bus(self):
+        bus = PyoBus(self, monitor=self.monitor)
+        self.buses.append(bus)
+        return bus
+
+    def set_gain(self, level):
+        self.level = level
+        self.gain.value = 0 if self.muted else level
+
+    def set_mute(self, muted):
+        self.muted = muted
+        self.set_gain(self.level)
+
+    def fade(self, level, time):
+        self.gain.time = time
+        self.set_gain(level)
+
+    def close(self):
+        for bus in list(self.buses):
+            bus.close()
+        for voice in self.voices:
+            voice.stop()
+        self.buses = []
+        self.voices = []
+        if self.parent:
+            self.parent.remove(self.key)
+            if self in self.parent.buses:
+                self.parent.buses.remove(self)
+        self.mixer.stop()
+
+class PyoVoice:
+    moon = False  # set by Moon, so a LoadMonitor can thin out moon triggers first
+
+    def __init__(self, frequency, size, sustain_release_time, sound_file=None, bus=None, monitor=None, gain=1.0,
+                 transpose=0.0):
+        from pyo import Adsr, SfPlayer, Sine
+
+        self.frequency = frequency
+        self.size = size
+        self.release = sustain_release_time
+        self.sound_file = sound_file
+        self.bus = bus
+        self.monitor = monitor
+        # Transposed sound files play faster rather than keeping their length
+        ratio = 2 ** (transpose / 12)
+        if sound_file and os.path.isfile(sound_file):
+            self.sound = SfPlayer(sound_file, speed=ratio, loop=False, mul=gain)
+        else:
+            self.sound = Sine(freq=frequency * ratio, mul=0.3 * gain)
+        self.env = Adsr(attack=0.01, decay=size/100, sustain=min(size/200, sustain_release_time), release=sustain_release_time, dur=size/10, mul=self.sound.mul)
+        self.sound.mul = self.env
+        if bus is None:
+            self.sound.out()
+        else:
+            bus.add(self.sound if len(self.sound) == 1 else self.sound.mix(1))
+
+    def play(self, delay=0):
+        if self.monitor:
+            release = self.release * (SHORT_RELEASE if self.monitor.level >= 2 else 1)
+            if not self.monitor.allow(self, delay, self.env.dur + release):
+                return
+            self.env.release = release
+        self.env.play(delay=delay)
+
+    def variant(self, gain, transpose):
+        # Another voice for the same body on the same bus, for trigger lines with their own gain or transposition
+        if self.bus:
+            voice = self.bus.create_voice(self.frequency, self.size, self.release, self.sound_file, gain, transpose)
+        else:
+            voice = PyoVoice(self.frequency, self.size, self.release, self.sound_file, None, self.monitor, gain, transpose)
+        voice.moon = self.moon
+        return voice
+
+    def set_sustain_release(self, sustain_release_time):
+        self.release = sustain_release_time
+        self.env.sustain = min(self.size/200, sustain_release_time)
+        self.env.release = sustain_release_time
+
+    def stop(self):
+        self.sound.stop()
+        self.env.stop()
+
+class Recorder:
+    # Records the output in back to back files of `duration` milliseconds
+    def __init__(self, audio, duration=19000, prefix='recording'):
+        self.audio = audio
+        self.duration = duration
+        self.prefix = prefix
+        self.is_recording = False
+        self.start_time = 0
+        self.counter = 0
+
+    def start(self, now):
+        self.is_recording = True
+        self.start_time = now
+        self.audio.recstart(f"{self.prefix}_{self.counter}.wav")
+
+    def stop(self):
+        self.is_recording = False
+        self.audio.recstop()
+        self.counter += 1
+
+    def toggle(self, now):
+        if self.is_recording:
+            self.stop()
+        else:
+            self.start(now)
+        return self.is_recording
+
+    def update(self, now):
+        if self.is_recording and now - self.start_time >= self.duration:
+            self.stop()
+            self.start(now)
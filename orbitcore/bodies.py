@@ -0,0 +1,172 @@
+import math
+
+from .constants import CENTER, FRAME_RATE
+
+# Most triggers a single body may fire per second; faster crossings are dropped and counted
+MAX_TRIGGER_RATE = FRAME_RATE
+# Shared by every body without moons until its first one is added
+NO_MOONS = ()
+# Shared by every body until it first plays on a transposed or quieter trigger line
+NO_LINE_VOICES = {}
+
+def trigger_gap(max_trigger_rate):
+    # Frames a body waits after a trigger before it may fire again
+    if not max_trigger_rate > 0:
+        raise ValueError(f"MaxTriggerRate must be above 0, got {max_trigger_rate:g}")
+    return FRAME_RATE / min(max_trigger_rate, FRAME_RATE)
+
+class CelestialBody:
+    # Slots instead of a __dict__ per body, so scenes of 100k bodies stay small (see memoryreport.py)
+    __slots__ = ('radius', 'size', '_angle', 'phase', 'frequency', 'eccentricity', 'orbit_angle', 'sound_file',
+                 'voice', 'line_voices', 'dropped_triggers', 'trigger_count', '_glow', 'column',
+                 'moons', 'max_trigger_rate')
+    bus = None
+    events = None  # an events.EventOutput set here while running receives every trigger
+
+    def __init__(self, radius, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file=None, audio=None):
+        self.radius = radius
+        self.size = size
+        # (TriggerLines, row) once a playing scene keeps this body's angle and glow in its columns
+        self.column = None
+        self.angle = 0
+        self.phase = 0  # angle at orbit time 0, so seek() can place the body directly
+        self.frequency = frequency
+        self.eccentricity = eccentricity
+        self.orbit_angle = orbit_angle
+        self.sound_file = sound_file
+        # Without an audio backend the body still moves and tracks crossings, it just stays silent
+        self.voice = audio.create_voice(frequency, size, sustain_release_time, sound_file) if audio else None
+        self.line_voices = NO_LINE_VOICES
+        self.dropped_triggers = 0
+        self.trigger_count = 0
+        self.glow = 0
+        self.moons = NO_MOONS
+        self.max_trigger_rate = MAX_TRIGGER_RATE
+
+    @property
+    def angle(self):
+        column = self.column
+        return self._angle if column is None else float(column[0].angle[column[1]])
+
+    @angle.setter
+    def angle(self, angle):
+        column = self.column
+        if column is None:
+            self._angle = angle
+        else:
+            column[0].angle[column[1]] = angle
+
+    @property
+    def glow(self):
+        column = self.column
+        return self._glow if column is None else int(column[0].glow[column[1]])
+
+    @glow.setter
+    def glow(self, glow):
+        column = self.column
+        if column is None:
+            self._glow = glow
+        else:
+            column[0].glow[column[1]] = glow
+
+    def add_moon(self, moon):
+        if self.moons is NO_MOONS:
+            self.moons = []
+        self.moons.append(moon)
+
+    def family(self):
+        # This body and everything orbiting it, each after the body it orbits, in settings file order
+        bodies = [self]
+        for moon in self.moons:
+            bodies.extend(moon.family())
+        return bodies
+
+    def trigger(self, offset=0, line=None):
+        # The crossing happened `offset` of a tick into the tick just simulated, so delaying the
+        # note by that much keeps the spacing between notes exact at the cost of one tick of latency
+        voice = self.line_voice(line)
+        if voice:
+            voice.play(offset / FRAME_RATE)
+        if self.events:
+            self.events.crossing(self, offset, line)
+        self.trigger_count += 1
+        self.glow = 255
+
+    def line_voice(self, line):
+        # The voice for a trigger line: this body's own unless the line transposes or changes the gain,
+        # then one more voice per distinct setting
+        if line is None or (line['gain'] == 1 and line['transpose'] == 0) or not self.voice:
+            return self.voice
+        key = (line['gain'], line['transpose'])
+        if key not in self.line_voices:
+            if self.line_voices is NO_LINE_VOICES:
+                self.line_voices = {}
+            self.line_voices[key] = self.voice.variant(line['gain'], line['transpose'])
+        return self.line_voices[key]
+
+    def set_sustain_release(self, sustain_release_time):
+        if self.voice:
+            self.voice.set_sustain_release(sustain_release_time)
+        for voice in self.line_voices.values():
+            voice.set_sustain_release(sustain_release_time)
+        for moon in self.moons:
+            moon.set_sustain_release(sustain_release_time)
+
+    def seek(self, orbit_time):
+        # orbit_time is the speed multiplier summed over frames, so angle is linear in it
+        self.angle = (self.phase + orbit_time / self.radius) % (2 * math.pi)
+        self.glow = 0
+        for moon in self.moons:
+            moon.seek(orbit_time)
+
+    def anchor(self, orbit_time):
+        self.phase = self.angle - orbit_time / self.radius
+        for moon in self.moons:
+            moon.anchor(orbit_time)
+
+    def relative_position(self):
+        r = self.radius * (1 - self.eccentricity**2) / (1 + self.eccentricity * math.cos(self.angle))
+        return int(r * math.cos(self.angle + self.orbit_angle)), int(r * math.sin(self.angle + self.orbit_angle))
+
+    def calculate_position(self):
+        x, y = self.relative_position()
+        return CENTER[0] + x, CENTER[1] + y
+
+class Planet(CelestialBody):
+    __slots__ = ('bus',)
+
+    def __init__(self, radius, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file=None, audio=None):
+        # The planet and everything orbiting it play through one bus, which carries the planet's gain and mute
+        self.bus = audio.planet_bus() if audio else None
+        super().__init__(radius, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file, self.bus)
+
+class Moon(CelestialBody):
+    # `planet` is the body this one orbits, which may itself be a moon
+    __slots__ = ('planet', 'bus')
+
+    def __init__(self, planet, distance, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file=None, audio=None):
+        self.planet = planet
+        self.bus = planet.bus
+        if audio and self.bus:
+            audio = self.bus
+        super().__init__(distance, size, frequency, eccentricity, orbit_angle, sustain_release_time, sound_file, audio)
+        if self.voice:
+            self.voice.moon = True
+
+    def calculate_position(self):
+        planet_x, planet_y = self.planet.calculate_position()
+        x, y = self.relative_position()
+        return planet_x + x, planet_y + y
+
+def positions(planets):
+    # Screen position of every body in the scene, each parent's computed once and reused by its moons
+    result = {}
+    for planet in planets:
+        for body in planet.family():
+            x, y = body.relative_position()
+            if isinstance(body, Moon):
+                parent_x, parent_y = result[id(body.planet)]
+            else:
+                parent_x, parent_y = CENTER
+            result[id(body)] = (parent_x + x, parent_y + y)
+    return result
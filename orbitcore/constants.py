@@ -0,0 +1,16 @@
+# Screen setup
+WIDTH, HEIGHT = 1280, 720
+
+# Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+PURPLE = (128, 0, 128)
+BLUE = (0, 0, 255)
+RED = (255, 0, 0)
+
+# Orbit setup
+CENTER = (WIDTH // 2, HEIGHT // 2)
+
+# The demos advance every body once per clock.tick(60), so one frame is 1/60 s
+FRAME_RATE = 60
+FRAME_MS = 1000 / FRAME_RATE
@@ -0,0 +1,74 @@
+import math
+import pygame
+
+from .bodies import positions
+from .constants import BLUE, CENTER, HEIGHT, PURPLE, RED, WHITE, WIDTH
+from .lines import trigger_direction
+
+class Display:
+    # The window only opens the first time the screen is asked for
+    def __init__(self, width=WIDTH, height=HEIGHT, caption="Polyorbit"):
+        self.size = (width, height)
+        self.caption = caption
+        self._screen = None
+
+    @property
+    def screen(self):
+        if self._screen is None:
+            pygame.init()
+            self._screen = pygame.display.set_mode(self.size)
+            pygame.display.set_caption(self.caption)
+        return self._screen
+
+def to_screen(position, zoom_level):
+    x, y = position
+    return int((x - CENTER[0]) * zoom_level + CENTER[0]), int((y - CENTER[1]) * zoom_level + CENTER[1])
+
+def draw_trigger_lines(surface, lines):
+    # Each trigger line through CENTER, or out from it for a ray, to past the edge of the screen
+    reach = math.hypot(*surface.get_size())
+    for line in lines:
+        dx, dy = trigger_direction(line)
+        end = (CENTER[0] + dx * reach, CENTER[1] + dy * reach)
+        start = CENTER if line['ray'] else (CENTER[0] - dx * reach, CENTER[1] - dy * reach)
+        pygame.draw.line(surface, RED, start, end, 1)
+
+def draw_body(surface, body, color, zoom_level, position=None):
+    x, y = to_screen(position if position else body.calculate_position(), zoom_level)
+
+    if body.glow > 0:
+        glow_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+        pygame.draw.circle(glow_surface, (*color, body.glow), (x, y), int(max(body.size * zoom_level * 1.5, 1)))
+        surface.blit(glow_surface, (0, 0))
+
+    pygame.draw.circle(surface, color, (x, y), int(max(body.size * zoom_level, 1)))
+
+def draw_planet(surface, planet, zoom_level, found=None):
+    # `found` is what bodies.positions returned for the scene, otherwise positions are worked out here
+    if found is None:
+        found = positions([planet])
+    draw_body(surface, planet, WHITE, zoom_level, found[id(planet)])
+    for moon in planet.family()[1:]:
+        draw_body(surface, moon, BLUE, zoom_level, found[id(moon)])
+
+def draw_orbit(surface, body, origin, color, zoom_level):
+    points = []
+    for angle in range(0, 360, 5):
+        r = body.radius * (1 - body.eccentricity**2) / (1 + body.eccentricity * math.cos(math.radians(angle)))
+        x = origin[0] + int(r * math.cos(math.radians(angle) + body.orbit_angle)) * zoom_level
+        y = origin[1] + int(r * math.sin(math.radians(angle) + body.orbit_angle)) * zoom_level
+        points.append((x, y))
+    pygame.draw.lines(surface, color, True, points, 1)
+
+def draw_moon_orbits(surface, planet, zoom_level, found=None):
+    if found is None:
+        found = positions([planet])
+    for moon in planet.family()[1:]:
+        draw_orbit(surface, moon, to_screen(found[id(moon.planet)], zoom_level), BLUE, zoom_level)
+
+def draw_scene(surface, planets, zoom_level):
+    found = positions(planets)
+    for planet in planets:
+        draw_orbit(surface, planet, CENTER, PURPLE, zoom_level)
+        draw_planet(surface, planet, zoom_level, found)
+        draw_moon_orbits(surface, planet, zoom_level, found)
@@ -0,0 +1,291 @@
+import heapq
+import itertools
+import math
+import socket
+import struct
+import threading
+import time
+
+from .bodies import CelestialBody
+from .constants import FRAME_RATE
+from .lines import DEFAULT_TRIGGER, transpose_ratio
+
+# Crossings for external synths and lights: OSC bundles timetagged ahead of time, MIDI notes sent
+# on time from a scheduler thread, and Standard MIDI Files of a precomputed timeline.
+
+OSC_ADDRESS = '/polyorbit/crossing'
+# Seconds every event is scheduled after its note starts; timetagged receivers play it on time
+# as long as it arrives within this, so set it to about the audio output latency
+LOOKAHEAD = 0.05
+# Seconds from 1900, where OSC time starts, to 1970
+NTP_EPOCH = 2208988800
+# 120 bpm at 480 ticks per beat, so 960 ticks per second
+MIDI_TICKS_PER_BEAT = 480
+MIDI_TEMPO = 500000
+
+def parse_target(text):
+    # "host:port" or just "port" on this machine
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+def midi_note(frequency):
+    return max(0, min(127, round(69 + 12 * math.log2(frequency / 440))))
+
+def midi_velocity(size, gain=1.0):
+    return max(1, min(127, round((40 + 4 * size) * gain)))
+
+def note_length(size):
+    # Seconds, the same as the voice envelope
+    return size / 10
+
+def osc_string(text):
+    data = text.encode() + b'\0'
+    return data + b'\0' * (-len(data) % 4)
+
+def read_osc_string(packet, i):
+    end = packet.index(b'\0', i)
+    return packet[i:end].decode(), (end + 4) & ~3
+
+def osc_message(address, *args):
+    tags = ','
+    data = b''
+    for arg in args:
+        if isinstance(arg, int):
+            tags += 'i'
+            data += struct.pack('>i', arg)
+        elif isinstance(arg, float):
+            tags += 'f'
+            data += struct.pack('>f', arg)
+        else:
+            tags += 's'
+            data += osc_string(str(arg))
+    return osc_string(address) + osc_string(tags) + data
+
+def osc_bundle(unix_time, messages):
+    seconds = unix_time + NTP_EPOCH
+    data = osc_string('#bundle') + struct.pack('>II', int(seconds), int(seconds % 1 * 2**32))
+    for message in messages:
+        data += struct.pack('>i', len(message)) + message
+    return data
+
+def parse_osc(packet, timetag=None):
+    # [(unix time or None, address, args)] for a message or a bundle, nested bundles included
+    if packet.startswith(b'#bundle\0'):
+        seconds, fraction = struct.unpack('>II', packet[8:16])
+        timetag = seconds - NTP_EPOCH + fraction / 2**32
+        messages = []
+        i = 16
+        while i < len(packet):
+            size = struct.unpack('>i', packet[i:i + 4])[0]
+            messages.extend(parse_osc(packet[i + 4:i + 4 + size], timetag))
+            i += 4 + size
+        return messages
+
+    address, i = read_osc_string(packet, 0)
+    tags, i = read_osc_string(packet, i)
+    args = []
+    for tag in tags[1:]:
+        if tag == 'i':
+            args.append(struct.unpack('>i', packet[i:i + 4])[0])
+            i += 4
+        elif tag == 'f':
+            args.append(struct.unpack('>f', packet[i:i + 4])[0])
+            i += 4
+        elif tag == 's':
+            text, i = read_osc_string(packet, i)
+            args.append(text)
+        else:
+            raise ValueError(f"unsupported OSC type tag {tag!r}")
+    return [(timetag, address, args)]
+
+class OscSink:
+    # Sends each crossing straight away as a bundle timetagged with when it is due:
+    # /polyorbit/crossing body frequency size planet line scene
+    def __init__(self, target):
+        self.target = target
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def schedule(self, output, due, event):
+        message = osc_message(OSC_ADDRESS, event['body'], float(event['frequency']), int(event['size']),
+                              event['planet'], event['line'], event['scene'])
+        self.socket.sendto(osc_bundle(output.unix_time(due), [message]), self.target)
+
+    def close(self):
+        self.socket.close()
+
+class MidiSink:
+    # MIDI messages carry no time, so note on and note off are sent when due by the output's
+    # scheduler. One channel per planet, velocity from size.
+    def __init__(self, port_name=None):
+        try:
+            import mido
+        except ImportError:
+            raise RuntimeError("MIDI output needs mido and python-rtmidi: pip install mido python-rtmidi") from None
+        self.mido = mido
+        self.port = mido.open_output(port_name or None)
+
+    def schedule(self, output, due, event):
+        note, channel = midi_note(event['frequency']), event['planet'] % 16
+        on = self.mido.Message('note_on', note=note, velocity=midi_velocity(event['size'], event['gain']), channel=channel)
+        off = self.mido.Message('note_off', note=note, channel=channel)
+        output.enqueue(due, self.port.send, on)
+        output.enqueue(due + note_length(event['size']), self.port.send, off)
+
+    def close(self):
+        self.port.close()
+
+class EventOutput:
+    # Receives every trigger of the playing scene (set on CelestialBody while running) and hands it
+    # to the sinks, due `lookahead` seconds after its note starts. `clock` gives the time of the tick
+    # being simulated; SimulationWorker.tick_time avoids the jitter of when the thread woke up.
+    def __init__(self, simulation, sinks, lookahead=LOOKAHEAD, clock=time.perf_counter):
+        self.simulation = simulation
+        self.sinks = sinks
+        self.lookahead = lookahead
+        self.clock = clock
+        self.index = {}
+        self.index_key = None
+        self.queue = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.sent = 0
+        self.late = 0
+        self.wall_offset = time.time() - time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def unix_time(self, due):
+        return due + self.wall_offset
+
+    def describe(self, body):
+        # (body number in settings file order, planet number, scene number), all from 0. Scenes fading
+        # out after a switch keep triggering, so their bodies are numbered too, each within its own
+        # scene; the scene number counts switches, so bodies of the two cannot be mixed up.
+        switcher = self.simulation.switcher
+        key = [id(self.simulation.scene)] + [id(scene) for scene, end_time in switcher.fading]
+        if key != self.index_key or id(body) not in self.index:
+            self.index_key = key
+            self.index = {}
+            scenes = [scene for scene, end_time in switcher.fading] + [self.simulation.scene]
+            for scene_index, scene in enumerate(scenes, self.simulation.switches - len(switcher.fading)):
+                count = 0
+                for planet_index, planet in enumerate(scene.planets):
+                    for member in planet.family():
+                        self.index[id(member)] = (count, planet_index, scene_index)
+                        count += 1
+            # A body in none of them is remembered too, so it is only looked for once
+            self.index.setdefault(id(body), None)
+        return self.index[id(body)] or (-1, -1, -1)
+
+    def crossing(self, body, offset, line=None):
+        line = line or DEFAULT_TRIGGER
+        due = self.clock() + offset / FRAME_RATE + self.lookahead
+        body_id, planet_index, scene_index = self.describe(body)
+        event = {'body': body_id, 'frequency': body.frequency * transpose_ratio(line), 'size': body.size,
+                 'planet': planet_index, 'line': line['index'], 'gain': line['gain'], 'scene': scene_index}
+        for sink in self.sinks:
+            sink.schedule(self, due, event)
+
+    def enqueue(self, due, send, message):
+        with self.condition:
+            heapq.heappush(self.queue, (due, next(self.order), send, message))
+            self.condition.notify()
+
+    def run(self):
+        with self.condition:
+            while not self.stopped:
+                if not self.queue:
+                    self.condition.wait()
+                    continue
+                delay = self.queue[0][0] - time.perf_counter()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+                due, _, send, message = heapq.heappop(self.queue)
+                if delay < -0.001:
+                    self.late += 1
+                send(message)
+                self.sent += 1
+
+    def start(self):
+        CelestialBody.events = self
+        self.thread.start()
+
+    def stop(self):
+        CelestialBody.events = None
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+class OscListener(threading.Thread):
+    # Collects (timetag, arrival, address, args) of every OSC message sent to `port`, e.g. to check an EventOutput
+    def __init__(self, port, host='127.0.0.1'):
+        super().__init__(daemon=True)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.settimeout(0.2)
+        self.received = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                packet = self.socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            arrival = time.time()
+            for timetag, address, args in parse_osc(packet):
+                self.received.append((timetag, arrival, address, args))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.socket.close()
+
+def vlq(value):
+    # MIDI variable length quantity
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(data))
+
+def write_midi_file(filename, bodies, times, body_indices, lines=None):
+    # A format 0 Standard MIDI File of the crossings at `times` seconds by the body dicts from
+    # settings.read_scene, one channel per planet. `lines` are the trigger lines crossed, if not all the default one
+    planet_numbers = []
+    planets = 0
+    for body in bodies:
+        if body['parent'] is None:
+            planet_numbers.append(planets)
+            planets += 1
+        else:
+            planet_numbers.append(planet_numbers[body['parent']])
+
+    ticks_per_second = MIDI_TICKS_PER_BEAT * 1000000 / MIDI_TEMPO
+    events = []
+    for t, index, line in zip(times, body_indices, lines or [DEFAULT_TRIGGER] * len(times)):
+        body = bodies[index]
+        note, channel = midi_note(body['frequency'] * transpose_ratio(line)), planet_numbers[index] % 16
+        start = round(t * ticks_per_second)
+        end = round((t + note_length(body['size'])) * ticks_per_second)
+        events.append((start, 1, bytes([0x90 | channel, note, midi_velocity(body['size'], line['gain'])])))
+        events.append((end, 0, bytes([0x80 | channel, note, 0])))
+    events.sort(key=lambda event: event[:2])  # note offs before note ons on the same tick
+
+    track = [b'\x00\xff\x51\x03' + MIDI_TEMPO.to_bytes(3, 'big')]
+    last = 0
+    for tick, _, message in events:
+        track.append(vlq(tick - last) + message)
+        last = tick
+    track.append(b'\x00\xff\x2f\x00')
+    track = b''.join(track)
+    with open(filename, 'wb') as midi:
+        midi.write(b'MThd' + struct.pack('>IHHH', 6, 0, 1, MIDI_TICKS_PER_BEAT))
+        midi.write(b'MTrk' + struct.pack('>I', len(track)) + track)
@@ -0,0 +1,147 @@
+import json
+import math
+import os
+import re
+import threading
+
+from .constants import FRAME_RATE
+from .settings import read_scene
+
+CACHE_FILE = '.scenelibrary.json'
+# Seconds between rescans of the library directories
+SCAN_INTERVAL = 2.0
+# A long first scan publishes what it has found every this many files
+PUBLISH_EVERY = 200
+
+def scene_metadata(file):
+    scene = read_scene(file)
+    bodies = scene['bodies']
+    radii = [body['radius'] for body in bodies]
+    return {
+        'bodies': len(bodies),
+        'planets': sum(1 for body in bodies if body['parent'] is None),
+        'scale': scene['selected_scale'],
+        'speed': scene['speed_multiplier'],
+        # Every angle is speed * t / radius, so integer distances repeat after 2*pi*lcm / speed frames
+        'cycle': 2 * math.pi * math.lcm(*radii) / scene['speed_multiplier'] / FRAME_RATE if radii else 0.0,
+    }
+
+def format_cycle(seconds):
+    if seconds >= 3600:
+        return f"{seconds / 3600:.0f} h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds:.1f} s"
+
+def matches(path, meta, query):
+    # Every word of `query` must match: plain words against the file name and scale,
+    # and bodies/planets/speed/cycle followed by < or > and a number against the metadata
+    for word in query.lower().split():
+        compare = re.fullmatch(r'(bodies|planets|speed|cycle)([<>])([0-9.]+)', word)
+        if compare:
+            key, op, value = compare.groups()
+            try:
+                value = float(value)
+            except ValueError:
+                return False
+            if (meta[key] < value) if op == '<' else (meta[key] > value):
+                continue
+            return False
+        if word not in path.lower() and word not in meta['scale'].lower():
+            return False
+    return True
+
+class SceneLibrary:
+    # Metadata for every .ini under `directories`, read once per file version (mtime and size) and
+    # remembered across runs in `cache_file`. A background thread rescans, so new files show up
+    # without a restart; `version` goes up whenever the list or any metadata changes.
+    def __init__(self, directories=('.',), cache_file=CACHE_FILE, interval=SCAN_INTERVAL):
+        self.directories = list(directories)
+        self.cache_file = cache_file
+        self.interval = interval
+        self.entries = {}
+        self.version = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.load_cache()
+
+    def load_cache(self):
+        try:
+            with open(self.cache_file) as cache:
+                self.entries = json.load(cache)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save_cache(self):
+        with self.lock:
+            entries = dict(self.entries)
+        try:
+            with open(self.cache_file, 'w') as cache:
+                json.dump(entries, cache)
+        except OSError:
+            pass  # a read-only library still works, it just rescans next time
+
+    def scan(self):
+        seen = set()
+        fresh = 0
+        for directory in self.directories:
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if not name.endswith('.ini'):
+                        continue
+                    path = os.path.normpath(os.path.join(root, name))
+                    seen.add(path)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entry = self.entries.get(path)
+                    if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                        continue
+
+                    entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+                    try:
+                        entry['meta'] = scene_metadata(path)
+                    except Exception as e:
+                        entry['error'] = str(e) or type(e).__name__  # not a scene; not read again until it changes
+                    with self.lock:
+                        self.entries[path] = entry
+                    fresh += 1
+                    if fresh % PUBLISH_EVERY == 0:
+                        self.version += 1
+
+        gone = [path for path in self.entries if path not in seen]
+        if gone:
+            with self.lock:
+                for path in gone:
+                    del self.entries[path]
+        if fresh or gone:
+            self.version += 1
+            self.save_cache()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.scan()
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def find(self, query='', limit=None):
+        # (path, metadata) of matching scenes in path order, at most `limit` of them, and how many matched
+        with self.lock:
+            found = [(path, entry['meta']) for path, entry in sorted(self.entries.items())
+                     if 'meta' in entry and matches(path, entry['meta'], query)]
+        return found[:limit], len(found)
+
+    def metadata(self, path):
+        entry = self.entries.get(os.path.normpath(path))
+        return entry.get('meta') if entry else None
@@ -0,0 +1,20 @@
+import math
+
+# Trigger lines through CENTER, kept free of numpy so reading and saving scenes stays cheap to import.
+# Angle is in degrees clockwise from straight up; a line runs both ways through CENTER, a ray only
+# out in the Angle direction. Crossing one plays the body's note Transpose semitones up, at Gain.
+DEFAULT_TRIGGER = {'index': 0, 'angle': 0.0, 'ray': False, 'gain': 1.0, 'transpose': 0.0}
+
+def trigger_normal(line):
+    # Unit vector across the line; the signed distance of (x, y) from CENTER is x * nx + y * ny,
+    # which for the default line is the horizontal distance from it
+    angle = math.radians(line['angle'])
+    return math.cos(angle), math.sin(angle)
+
+def trigger_direction(line):
+    # Unit vector along the line, pointing out along a ray, in screen coordinates (y down)
+    angle = math.radians(line['angle'])
+    return math.sin(angle), -math.cos(angle)
+
+def transpose_ratio(line):
+    return 2 ** (line['transpose'] / 12)
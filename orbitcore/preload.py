@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .settings import SUSTAIN_RELEASE_TIME, build_planets, read_scene
+
+# Where a cued scene may take over from the playing one
+BOUNDARIES = ['Now', 'Next crossing', 'Next downbeat']
+
+class LoadedScene:
+    def __init__(self, file, planets, speed_multiplier, sustain_release_time, bus=None, triggers=None):
+        self.file = file
+        self.planets = planets
+        self.speed_multiplier = speed_multiplier
+        self.sustain_release_time = sustain_release_time
+        self.bus = bus
+        from .triggers import TriggerLines  # numpy, only once a scene is built to play
+        self.triggers = TriggerLines(triggers)
+
+def load_scene(file, audio=None, sustain_release_time=SUSTAIN_RELEASE_TIME, level=1.0):
+    return build_scene(file, read_scene(file), audio, sustain_release_time, level)
+
+def build_scene(file, scene, audio=None, sustain_release_time=SUSTAIN_RELEASE_TIME, level=1.0):
+    # `scene` is what settings.read_scene returned for `file`. With an audio backend the scene gets
+    # its own bus so it can be faded as a whole.
+    bus = audio.bus(level) if audio else None
+    if scene['sustain_release_time'] is not None:
+        sustain_release_time = scene['sustain_release_time']
+    planets = build_planets(scene, sustain_release_time, bus)
+    return LoadedScene(file, planets, scene['speed_multiplier'], sustain_release_time, bus, scene['triggers'])
+
+class ScenePreloader:
+    # Builds scenes, pyo graph included, on worker threads so the frame loop never waits for them
+    def __init__(self, audio=None, workers=1):
+        self.audio = audio
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}
+
+    def preload(self, file, sustain_release_time=SUSTAIN_RELEASE_TIME):
+        if file not in self.pending:
+            self.pending[file] = self.executor.submit(load_scene, file, self.audio, sustain_release_time, 0.0)
+
+    def future(self, file, sustain_release_time=SUSTAIN_RELEASE_TIME):
+        # The load of `file`, started if it was not yet, for waiting on it rather than polling is_ready
+        self.preload(file, sustain_release_time)
+        return self.pending[file]
+
+    def is_ready(self, file):
+        return file in self.pending and self.pending[file].done()
+
+    def take(self, file):
+        # The loaded scene once it is ready, otherwise None; a failed load raises here
+        if not self.is_ready(file):
+            return None
+        return self.pending.pop(file).result()
+
+    def discard(self, file):
+        future = self.pending.pop(file, None)
+        if future is not None:
+            future.add_done_callback(close_loaded)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def close_scene(scene):
+    if scene.bus:
+        scene.bus.close()
+
+def keep_planets(scene, numbers):
+    # Plays only the planets numbered (from 1, in settings file order) in `numbers`, with their moons,
+    # so a scene can be split across instances
+    for number, planet in enumerate(scene.planets, 1):
+        if number not in numbers and planet.bus:
+            planet.bus.close()
+    scene.planets = [planet for number, planet in enumerate(scene.planets, 1) if number in numbers]
+
+def close_loaded(future):
+    if future.cancelled():
+        return
+    if future.exception() is None:
+        close_scene(future.result())
+
+def boundary_count(planets, boundary):
+    # Crossings counted towards a boundary: any planet for a crossing, the outermost one for a downbeat
+    if not planets or boundary == 'Now':
+        return 0
+    if boundary == 'Next downbeat':
+        return max(planets, key=lambda planet: planet.radius).trigger_count
+    return sum(planet.trigger_count for planet in planets)
+
+class SceneSwitcher:
+    def __init__(self, fade_time=2.0):
+        self.fade_time = fade_time
+        self.cued = None
+        self.boundary = 'Now'
+        self.start_count = 0
+        self.fading = []
+
+    def cue(self, scene, current_planets, boundary):
+        if self.cued is not None and self.cued is not scene:
+            close_scene(self.cued)
+        self.cued = scene
+        self.boundary = boundary
+        self.start_count = boundary_count(current_planets, boundary)
+
+    def due(self, current_planets):
+        # Call after the playing scene has been updated for this tick
+        if self.cued is None:
+            return False
+        return self.boundary == 'Now' or boundary_count(current_planets, self.boundary) != self.start_count
+
+    def switch(self, current, now):
+        # Crossfades from `current` to the cued scene and returns the cued scene;
+        # `current` keeps being updated through `fading` until its fade is over
+        scene = self.cued
+        self.cued = None
+        if scene.bus:
+            scene.bus.fade(1.0, self.fade_time)
+        if current is not None:
+            if current.bus:
+                current.bus.fade(0.0, self.fade_time)
+            self.fading.append((current, now + self.fade_time * 1000))
+        return scene
+
+    def update(self, now):
+        # Advances scenes that are fading out and closes them once they are silent
+        for scene, end_time in self.fading:
+            scene.triggers.update(scene.planets, scene.speed_multiplier)
+        finished = [scene for scene, end_time in self.fading if now >= end_time]
+        self.fading = [(scene, end_time) for scene, end_time in self.fading if now < end_time]
+        for scene in finished:
+            close_scene(scene)
@@ -0,0 +1,116 @@
+import math
+import numpy as np
+
+from .constants import FRAME_RATE
+
+# Distances for scenes that loop exactly. A body at distance r turns speed / r radians per frame,
+# so if every planet sits at L / rate for integer rates, the whole scene repeats after
+# 2*pi*L / speed frames and the planets pulse in the ratio of their rates. Moons sit at a whole
+# fraction of their planet's distance, so their patterns repeat with every turn of the planet.
+
+# A target pulse may also be doubled, quadrupled and so on when a scene has more planets than targets
+OCTAVES = [1, 2, 4]
+BATCH = 4096
+# Each candidate layout is tried at its shortest valid L and this many multiples of it
+MULTIPLES = 16
+# How far past min_planet_distance each moon may sit, same spread as the random generator
+MOON_SPREAD = 20
+
+def parse_ratio(text):
+    # "3:4:5:7" -> [3, 4, 5, 7]
+    rates = [int(part) for part in text.replace(' ', '').split(':') if part]
+    if not rates or min(rates) <= 0:
+        raise ValueError(f"not a ratio: {text!r}")
+    return rates
+
+def max_cycle_distance(max_cycle_seconds, speed_multiplier):
+    # Largest L whose cycle fits in `max_cycle_seconds`
+    return int(max_cycle_seconds * FRAME_RATE * speed_multiplier / (2 * math.pi))
+
+def cycle_seconds(distance, speed_multiplier):
+    return 2 * math.pi * distance / speed_multiplier / FRAME_RATE
+
+def octaves_for(targets, count):
+    # OCTAVES, extended until there are enough distinct pulses for `count` planets
+    octaves = list(OCTAVES)
+    while len({target * octave for target in targets for octave in octaves}) < count:
+        octaves.append(octaves[-1] * 2)
+    return np.array(octaves)
+
+def planet_candidates(targets, count, rng, batch=BATCH):
+    # Rates for `count` planets, one row per candidate: targets in turn, each in a random octave.
+    # The first row moves a target up an octave only each time the targets run out, so the plain ratio is tried first.
+    octaves = octaves_for(targets, count)
+    base = np.resize(np.array(targets, dtype=np.int64), count)
+    chosen = octaves[rng.integers(0, len(octaves), size=(batch, count))]
+    chosen[0] = octaves[np.minimum(np.arange(count) // len(targets), len(octaves) - 1)]
+    return base * chosen
+
+def solve_planets(targets, count, min_distance, min_separation, max_distance, rng, batch=BATCH, multiples=MULTIPLES):
+    # Yields (L, planet distances) for candidate layouts, shortest cycle first and, for the same
+    # cycle, closest to the plain ratio first
+    rates = planet_candidates(targets, count, rng, batch)
+    shifts = np.sum(rates != np.resize(np.array(targets), count), axis=1)
+    lcms = np.lcm.reduce(rates, axis=1)
+
+    # Distances are L / rate, so the innermost planet and the closest pair both grow linearly with L,
+    # which gives the smallest L each layout needs directly
+    inverse = np.sort(1 / rates, axis=1)
+    gaps = np.min(np.diff(inverse, axis=1), axis=1) if count > 1 else np.full(batch, np.inf)
+    with np.errstate(divide='ignore'):
+        needed = np.maximum(min_distance / inverse[:, 0], max(min_separation, 1) / gaps)
+    usable = np.isfinite(needed) & (lcms > 0) & (lcms <= max_distance)
+    first = np.ceil(needed[usable] / lcms[usable]).astype(np.int64) * lcms[usable]
+    distances = (first[:, None] + lcms[usable][:, None] * np.arange(multiples)).ravel()
+    rows = np.repeat(np.nonzero(usable)[0], multiples)
+
+    within = distances <= max_distance
+    distances, rows = distances[within], rows[within]
+    for i in np.lexsort((shifts[rows], distances)):
+        distance, rate = int(distances[i]), rates[rows[i]]
+        if np.any(distance % rate):
+            continue  # lcm overflowed
+        radii = np.sort(distance // rate)
+        if radii[0] >= min_distance and (count < 2 or np.min(np.diff(radii)) >= max(min_separation, 1)):
+            yield distance, radii
+
+def moon_distances(planet_distance, sizes, min_distance, rng, batch=BATCH):
+    # Distances for moons of the given sizes, inner first, each a whole fraction of
+    # `planet_distance` and at least its own size further out than the moon inside it; None if impossible
+    count = len(sizes)
+    if count == 0:
+        return []
+    max_distance = min_distance + MOON_SPREAD * count
+    divisors = np.array([d for d in range(min_distance, max_distance + 1) if planet_distance % d == 0])
+    if len(divisors) < count:
+        return None
+
+    picks = np.sort(np.argsort(rng.random((batch, len(divisors))), axis=1)[:, :count], axis=1)
+    radii = divisors[picks]
+    valid = np.ones(batch, dtype=bool)
+    if count > 1:
+        valid = np.all(np.diff(radii, axis=1) >= np.array(sizes[1:]), axis=1)
+    if not valid.any():
+        return None
+    return radii[rng.choice(np.nonzero(valid)[0])].tolist()
+
+def solve_scene(targets, moon_sizes, min_center_distance, min_planet_distance, min_separation,
+                max_distance, rng=None, batch=BATCH):
+    # Planet and moon distances for a scene that repeats exactly, with the shortest cycle found.
+    # moon_sizes holds a list of moon sizes per planet, innermost planet first.
+    # Returns (L, planet distances, moon distances per planet) or None.
+    rng = rng if rng is not None else np.random.default_rng()
+    tried = {}
+    for distance, planets in solve_planets(targets, len(moon_sizes), min_center_distance, min_separation,
+                                           max_distance, rng, batch):
+        moons = []
+        for radius, sizes in zip(planets, moon_sizes):
+            key = (int(radius), tuple(sizes))
+            if key not in tried:
+                tried[key] = moon_distances(int(radius), sizes, min_planet_distance, rng, batch)
+            if tried[key] is None:
+                break
+            moons.append(tried[key])
+        else:
+            return distance, [int(radius) for radius in planets], moons
+    return None
@@ -0,0 +1,188 @@
+import numpy as np
+import pygame
+
+from .arrays import SceneArrays, scene_key
+from .constants import BLACK, BLUE, CENTER, PURPLE, WHITE
+from .display import draw_scene
+
+# Scenes with more bodies than this are drawn in batches; below it the per-body path is cheaper
+BATCH_THRESHOLD = 200
+ORBIT_POINTS = np.radians(np.arange(0, 360, 5))
+MAX_STAMPS = 1024
+
+class BatchRenderer:
+    def __init__(self):
+        self.arrays = None
+        self.stamps = {}
+        self.orbits = None
+
+    def stamp(self, radius, color, alpha=255):
+        key = (radius, color, alpha)
+        if key not in self.stamps:
+            if len(self.stamps) >= MAX_STAMPS:
+                self.stamps.clear()  # zooming keeps asking for new sizes
+            stamp = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+            pygame.draw.circle(stamp, (*color, alpha), (radius, radius), radius)
+            self.stamps[key] = stamp
+        return self.stamps[key]
+
+    def draw(self, surface, planets, zoom_level, snapshot=None):
+        # `snapshot` is an (x, y, glow) read from a SimulationWorker; it is only used while it
+        # still lines up with the bodies, e.g. not in the frame right after an edit
+        if self.arrays is None or self.arrays.key != scene_key(planets):
+            self.arrays = SceneArrays(planets)
+        arrays = self.arrays
+        if not arrays.bodies:
+            return
+
+        if snapshot is not None and len(snapshot[0]) == len(arrays.bodies):
+            x, y, glow = snapshot
+            glow = glow.astype(int)
+        else:
+            x, y = arrays.positions()
+            glow = arrays.glows()
+        screen_x = ((x - CENTER[0]) * zoom_level + CENTER[0]).astype(int)
+        screen_y = ((y - CENTER[1]) * zoom_level + CENTER[1]).astype(int)
+
+        self.draw_orbits(surface, arrays, screen_x, screen_y, zoom_level)
+
+        radius = np.maximum(arrays.size * zoom_level, 1).astype(int)
+        glow_radius = np.maximum(arrays.size * zoom_level * 1.5, 1).astype(int)
+
+        # Anything whose glow cannot reach the screen is skipped
+        width, height = surface.get_size()
+        visible = ((screen_x + glow_radius >= 0) & (screen_x - glow_radius < width) &
+                   (screen_y + glow_radius >= 0) & (screen_y - glow_radius < height))
+
+        glowing = np.nonzero(visible & (glow > 0))[0]
+        visible = np.nonzero(visible)[0]
+        blits = self.stamp_blits(glowing, glow_radius, arrays.is_moon, glow, screen_x, screen_y)
+        blits += self.stamp_blits(visible, radius, arrays.is_moon, np.full(len(radius), 255), screen_x, screen_y)
+        surface.blits(blits, doreturn=False)
+
+    def stamp_blits(self, indices, radius, is_moon, alpha, x, y):
+        # (stamp, position) for the bodies at `indices`, looking each different stamp up once
+        r = radius[indices]
+        keys, inverse = np.unique((r * 2 + is_moon[indices]) * 256 + alpha[indices], return_inverse=True)
+        stamps = [self.stamp(key // 512, BLUE if key // 256 % 2 else WHITE, key % 256) for key in keys.tolist()]
+        return list(zip([stamps[k] for k in inverse.tolist()], zip((x[indices] - r).tolist(), (y[indices] - r).tolist())))
+
+    def draw_orbits(self, surface, arrays, screen_x, screen_y, zoom_level):
+        key = (arrays.key, zoom_level, surface.get_size())
+        if self.orbits is None or self.orbits.key != key:
+            self.orbits = OrbitCache(arrays, zoom_level, surface.get_size())
+        self.orbits.draw(surface, screen_x, screen_y)
+
+class OrbitCache:
+    # Orbit outlines for one scene, zoom level and screen size. Planet orbits never move, so they
+    # are drawn once onto a layer. Moon orbits follow the body they circle, so each body's moon
+    # orbits are drawn onto a stamp of their own the first time it is on screen. Outlines less
+    # than a pixel across are left out, and so are planet orbits that go round the whole screen.
+    def __init__(self, arrays, zoom_level, size):
+        self.key = (arrays.key, zoom_level, size)
+        self.arrays = arrays
+        self.zoom_level = zoom_level
+        self.size = size
+        self.stamps = {}
+        # Furthest any point of each outline gets from the body it circles
+        reach = arrays.radius * (1 + arrays.eccentricity) * zoom_level
+
+        self.layer = pygame.Surface(size)
+        self.layer.set_colorkey(BLACK, pygame.RLEACCEL)
+        corner = np.hypot(max(CENTER[0], size[0] - CENTER[0]), max(CENTER[1], size[1] - CENTER[1]))
+        closest = (arrays.radius * (1 - arrays.eccentricity) - 2) * zoom_level
+        planets = np.nonzero(~arrays.is_moon & (reach >= 1) & (closest <= corner))[0]
+        for outline in (outline_points(arrays, planets, zoom_level) + CENTER).tolist():
+            pygame.draw.lines(self.layer, PURPLE, True, outline, 1)
+
+        # Moon orbits more than half the screen across are drawn each frame rather than kept, as
+        # there can only be a few of them on screen and their stamps would be large
+        moons = np.nonzero(arrays.is_moon & (reach >= 1))[0]
+        self.large = moons[reach[moons] > max(size) / 4]
+        self.large_reach = reach[self.large]
+        self.large_closest = closest[self.large]
+        moons = moons[reach[moons] <= max(size) / 4]
+
+        # The rest sorted by the body they circle, so body i's are moons[first[i]:last[i]]
+        self.moons = moons[np.argsort(arrays.parents[moons], kind='stable')]
+        parents = arrays.parents[self.moons]
+        self.first = np.searchsorted(parents, np.arange(len(arrays.bodies)))
+        self.last = np.searchsorted(parents, np.arange(len(arrays.bodies)), side='right')
+        self.reach = np.zeros(len(arrays.bodies))
+        np.maximum.at(self.reach, parents, reach[self.moons])
+        self.stamp_reach = np.ceil(self.reach).astype(int) + 1
+
+    def moon_outlines(self, parents, offsets):
+        # Outlines of the moons of every body in `parents`, moved by that body's entry in `offsets`,
+        # as one list per body. Points are truncated to pixels as pygame would, and a point on the
+        # same pixel as the one before it is dropped, which small orbits have plenty of.
+        counts = (self.last[parents] - self.first[parents]).tolist()
+        moons = np.concatenate([self.moons[self.first[i]:self.last[i]] for i in parents])
+        points = outline_points(self.arrays, moons, self.zoom_level) + np.repeat(offsets, counts, axis=0)[:, None, :]
+        points = points.astype(int)
+        keep = np.ones(points.shape[:2], dtype=bool)
+        keep[:, 1:-1] = np.any(points[:, 1:-1] != points[:, :-2], axis=2)
+        ends = np.cumsum(keep.sum(axis=1)).tolist()
+        points = points[keep].tolist()
+        outlines = [points[start:end] for start, end in zip([0] + ends, ends)]
+        groups = np.cumsum(counts).tolist()
+        return [outlines[start:end] for start, end in zip([0] + groups, groups)]
+
+    def make_stamps(self, parents):
+        reach = self.stamp_reach[parents]
+        for i, outlines, r in zip(parents, self.moon_outlines(parents, np.stack((reach, reach), axis=1)), reach):
+            stamp = pygame.Surface((2 * r + 1, 2 * r + 1))
+            stamp.set_colorkey(BLACK, pygame.RLEACCEL)
+            for outline in outlines:
+                pygame.draw.lines(stamp, BLUE, True, outline, 1)
+            self.stamps[i] = stamp
+
+    def draw(self, surface, screen_x, screen_y):
+        width, height = self.size
+        reach = self.reach
+        visible = np.nonzero((reach >= 1) & (screen_x + reach >= 0) & (screen_x - reach < width) &
+                             (screen_y + reach >= 0) & (screen_y - reach < height))[0]
+        new = [i for i in visible.tolist() if i not in self.stamps]
+        if new:
+            self.make_stamps(np.array(new))
+        offset = self.stamp_reach[visible]
+        blits = [(self.layer, (0, 0))]
+        blits += zip([self.stamps[i] for i in visible.tolist()],
+                     zip((screen_x[visible] - offset).tolist(), (screen_y[visible] - offset).tolist()))
+        surface.blits(blits, doreturn=False)
+
+        if len(self.large):
+            x = screen_x[self.arrays.parents[self.large]]
+            y = screen_y[self.arrays.parents[self.large]]
+            reach = self.large_reach
+            corner = np.hypot(np.maximum(x, width - x), np.maximum(y, height - y))
+            shown = ((x + reach >= 0) & (x - reach < width) & (y + reach >= 0) & (y - reach < height) &
+                     (self.large_closest <= corner))
+            points = outline_points(self.arrays, self.large[shown], self.zoom_level)
+            for outline in (points + np.stack((x[shown], y[shown]), axis=1)[:, None, :]).astype(int).tolist():
+                pygame.draw.lines(surface, BLUE, True, outline, 1)
+
+def outline_points(arrays, indices, zoom_level):
+    # Orbit outlines of the bodies at `indices` around the body each one circles, with the same
+    # pixel snapping as draw_orbit, as (bodies, points, x and y)
+    e = arrays.eccentricity[indices, None]
+    r = arrays.radius[indices, None] * (1 - e**2) / (1 + e * np.cos(ORBIT_POINTS))
+    angle = ORBIT_POINTS + arrays.orbit_angle[indices, None]
+    return np.stack((np.trunc(r * np.cos(angle)), np.trunc(r * np.sin(angle))), axis=2) * zoom_level
+
+class SceneRenderer:
+    # Picks the per-body drawing path for small scenes and the batched one for large scenes.
+    # `trails` is an optional trails.Trails, drawn underneath everything else.
+    def __init__(self, batch_threshold=BATCH_THRESHOLD, trails=None):
+        self.batch_threshold = batch_threshold
+        self.batch = BatchRenderer()
+        self.trails = trails
+
+    def draw(self, surface, planets, zoom_level, snapshot=None):
+        if self.trails:
+            self.trails.record(planets, snapshot)
+            self.trails.draw(surface, zoom_level)
+        if scene_key(planets)[1] > self.batch_threshold:
+            self.batch.draw(surface, planets, zoom_level, snapshot)
+        else:
+            draw_scene(surface, planets, zoom_level)
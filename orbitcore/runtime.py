@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# Seconds between writes of settings changes that keep coming, e.g. while a slider is dragged
+SAVE_INTERVAL = 0.5
+
+class Runtime:
+    # Runs a demo as asyncio tasks on the main thread, where pygame wants its window, each at its
+    # own rate. Blocking work goes to a thread pool so no task holds up the others.
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='runtime')
+        self.tasks = set()
+        self.stopped = None
+
+    def run(self, main):
+        # Runs the coroutine function `main(runtime)` until it returns, then the rest are cancelled
+        asyncio.run(self.main(main))
+
+    async def main(self, main):
+        self.stopped = asyncio.Event()
+        try:
+            await main(self)
+        finally:
+            await self.stop()
+            self.executor.shutdown(wait=True)
+
+    async def stop(self):
+        # Ends every periodic task and cancels the rest; work already in the thread pool finishes
+        self.stopped.set()
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def spawn(self, coroutine):
+        # Keeps a reference so the task is not collected, and logs it if it fails
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.finished)
+        return task
+
+    def finished(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            log.error("Task failed", exc_info=task.exception())
+
+    async def ticks(self, rate):
+        # Yields the seconds since the last tick, `rate` times a second on a fixed schedule.
+        # A tick that comes too late moves the schedule on rather than bunching the next ones up.
+        loop = asyncio.get_running_loop()
+        period = 1 / rate
+        due = last = loop.time()
+        while not self.stopped.is_set():
+            now = loop.time()
+            yield now - last
+            last = now
+            due += period
+            now = loop.time()
+            if due < now - period:
+                due = now
+            await asyncio.sleep(max(0, due - now))
+
+    def every(self, period, callback, *args):
+        # Calls callback(*args) every `period` seconds in a task of its own
+        async def repeat():
+            async for _ in self.ticks(1 / period):
+                callback(*args)
+        return self.spawn(repeat())
+
+    def offload(self, function, *args):
+        # Runs blocking work on the thread pool; await the result
+        return asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+class SettingsWriter:
+    # Writes settings files off the main thread, at most every `interval` seconds. Only the latest
+    # call of each writer for each file is kept, and calls run in the order they were last made.
+    def __init__(self, runtime, interval=SAVE_INTERVAL):
+        self.runtime = runtime
+        self.pending = {}
+        self.writing = None
+        runtime.every(interval, self.flush)
+
+    def save(self, write, filename, *args):
+        key = (write, filename)
+        self.pending.pop(key, None)
+        self.pending[key] = args
+
+    def flush(self):
+        if self.pending and not (self.writing and not self.writing.done()):
+            calls = [(write, filename, args) for (write, filename), args in self.pending.items()]
+            self.pending = {}
+            self.writing = self.runtime.offload(write_all, calls)
+
+    async def close(self):
+        if self.writing:
+            await self.writing
+        self.flush()
+        if self.writing:
+            await self.writing
+
+def write_all(calls):
+    for write, filename, args in calls:
+        try:
+            write(filename, *args)
+        except OSError as e:
+            log.error("Could not write %s: %s", filename, e)
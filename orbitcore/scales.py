@@ -0,0 +1,60 @@
+import math
+
+# Scales (3 octaves each where applicable)
+SCALES = {
+    "C Major": [131, 147, 165, 175, 196, 220, 247, 261, 293, 329, 349, 392, 440, 493, 523, 587, 659, 698, 784, 880, 987],
+    "C Natural Minor": [131, 147, 156, 175, 196, 208, 247, 261, 293, 311, 349, 392, 415, 493, 523, 587, 622, 698, 784, 831, 987],
+    "C Harmonic Minor": [131, 147, 156, 175, 196, 208, 247, 261, 293, 311, 349, 392, 440, 493, 523, 587, 622, 698, 784, 880, 987],
+    "C Melodic Minor": [131, 147, 156, 175, 196, 220, 247, 261, 293, 311, 349, 392, 440, 493, 523, 587, 622, 698, 784, 880, 987],
+    "C Blues": [131, 156, 175, 185, 196, 233, 261, 311, 349, 370, 392, 466, 523, 622, 698, 740, 784, 932],
+    "C Pentatonic Major": [131, 147, 165, 196, 220, 261, 293, 329, 392, 440, 523, 587, 659, 784, 880],
+    "C Pentatonic Minor": [131, 156, 175, 196, 233, 261, 311, 349, 392, 466, 523, 622, 698, 784, 932],
+    "C Dorian": [131, 147, 156, 175, 196, 220, 233, 261, 293, 311, 349, 392, 440, 466, 523, 587, 622, 698, 784, 880, 932],
+    "C Phrygian": [131, 139, 165, 175, 196, 208, 247, 261, 277, 329, 349, 392, 415, 493, 523, 554, 659, 698, 784, 831, 987],
+    "C Lydian": [131, 147, 165, 185, 196, 220, 247, 261, 293, 329, 370, 392, 440, 493, 523, 587, 659, 740, 784, 880, 987],
+    "C Mixolydian": [131, 147, 165, 175, 196, 220, 233, 261, 293, 329, 349, 392, 440, 466, 523, 587, 659, 698, 784, 880, 932],
+    "C Locrian": [131, 139, 165, 175, 185, 208, 247, 261, 277, 329, 349, 370, 415, 493, 523, 554, 659, 698, 740, 831, 987],
+    "C Whole Tone": [131, 147, 165, 185, 208, 233, 261, 293, 329, 370, 415, 466, 523, 587, 659, 740, 831, 932],
+    "C Diminished": [131, 147, 156, 175, 185, 208, 220, 247, 261, 293, 311, 349, 370, 415, 440, 493, 523, 587, 622, 698, 740, 831, 880, 987],
+    "C Augmented": [131, 147, 165, 185, 208, 233, 261, 293, 329, 370, 415, 466, 523, 587, 659, 740, 831, 932],
+    "C Bebop Dominant": [131, 147, 165, 175, 196, 220, 233, 247, 261, 293, 329, 349, 392, 440, 466, 493, 523, 587, 659, 698, 784, 880, 932, 987],
+    "C Bebop Major": [131, 147, 165, 175, 196, 208, 220, 247, 261, 293, 329, 349, 392, 415, 440, 493, 523, 587, 659, 698, 784, 831, 880, 987],
+    "C Altered": [131, 139, 165, 175, 185, 208, 233, 261, 277, 329, 349, 370, 415, 466, 523, 554, 659, 698, 740, 831, 932],
+}
+
+def get_frequency_in_scale(size, is_planet, has_moons, scale):
+    scale_frequencies = SCALES[scale]
+    
+    if is_planet:
+        inverted_size = 50 - size
+        if has_moons:
+            index = inverted_size * (len(scale_frequencies) // 2) // 50
+        else:
+            index = (inverted_size * (len(scale_frequencies) // 2) // 50) + (len(scale_frequencies) // 4)
+    else:
+        inverted_size = 15 - size
+        index = (inverted_size * (len(scale_frequencies) // 2) // 15) + (len(scale_frequencies) // 2)
+    
+    return scale_frequencies[min(max(index, 0), len(scale_frequencies) - 1)]
+
+def get_frequency_in_key(size, is_planet, has_moons, scale):
+    scale_frequencies = SCALES[scale]
+    
+    if is_planet:
+        inverted_size = 50 - size + 20
+        if has_moons:
+            index = (inverted_size - 20) * 14 // 30
+        else:
+            index = ((inverted_size - 20) * 14 // 30) + 7
+        return scale_frequencies[min(max(index, 0), len(scale_frequencies) - 1)]
+    else:
+        inverted_size = 16 - size
+        index = ((inverted_size - 1) * 7 // 14) + 14
+        return scale_frequencies[min(max(index, 14), len(scale_frequencies) - 1)]
+
+def pitch_class(frequency):
+    # Semitones above C, 0-11, of the nearest equal tempered note
+    return round(12 * math.log2(frequency / 130.81)) % 12
+
+def scale_pitch_classes(scale):
+    return {pitch_class(frequency) for frequency in SCALES[scale]}
@@ -0,0 +1,193 @@
+import configparser
+
+from .bodies import MAX_TRIGGER_RATE, Moon, Planet, trigger_gap
+from .lines import DEFAULT_TRIGGER
+
+# Initial SustainReleaseTime when a settings file does not set one
+SUSTAIN_RELEASE_TIME = 0.5
+
+def read_scene(file):
+    # Plain description of a settings file, without building any bodies or sound
+    config = configparser.ConfigParser()
+    if not config.read(file):
+        raise FileNotFoundError(file)
+
+    global_settings = config['Global']
+    elliptical_orbits = global_settings.getboolean('EllipticalOrbits')
+    sustain_release_time = global_settings.get('SustainReleaseTime')
+    max_trigger_rate = global_settings.getfloat('MaxTriggerRate', MAX_TRIGGER_RATE)
+    trigger_gap(max_trigger_rate)  # raises for a rate of 0 or below rather than failing on the first crossing
+    scene = {
+        'speed_multiplier': float(global_settings['SpeedMultiplier']),
+        'sustain_release_time': float(sustain_release_time) if sustain_release_time else None,
+        'elliptical_orbits': elliptical_orbits,
+        'selected_scale': global_settings.get('SelectedScale', 'C Major'),
+        'max_trigger_rate': max_trigger_rate,
+        'triggers': read_triggers(config),
+        'bodies': [],
+    }
+    bodies = scene['bodies']
+
+    def add_body(section, planet, moon, parent):
+        sound_file = config[section].get('SoundFile', '').strip()
+        bodies.append({
+            'name': section,
+            'planet': planet,
+            'moon': moon,
+            'parent': parent,
+            'size': int(config[section]['Size']),
+            'frequency': float(config[section]['Frequency']),
+            'radius': int(config[section]['Distance']),
+            'eccentricity': float(config[section]['Eccentricity']) if elliptical_orbits else 0.0,
+            'orbit_angle': float(config[section]['OrbitAngle']) if elliptical_orbits else 0.0,
+            'sound_file': sound_file if sound_file else None,
+            'gain': config[section].getfloat('Gain', 1.0),
+            'muted': config[section].getboolean('Mute', False),
+        })
+        return len(bodies) - 1
+
+    def add_moons(section, planet, parent):
+        # Moons can have moons of their own: Planet1Moon2Moon1 orbits Planet1Moon2
+        for j in range(1, int(config[section].get('NumberOfMoons', 0)) + 1):
+            moon_section = f'{section}Moon{j}'
+            add_moons(moon_section, planet, add_body(moon_section, planet, j, parent))
+
+    for i in range(1, int(global_settings['NumberOfPlanets']) + 1):
+        section = f'Planet{i}'
+        add_moons(section, i, add_body(section, i, 0, None))
+
+    return scene
+
+def read_triggers(config):
+    # [Trigger1], [Trigger2]... up to NumberOfTriggers in [Global], each with Angle, Ray, Gain and
+    # Transpose; without any, the vertical line through CENTER
+    triggers = []
+    for i in range(1, config['Global'].getint('NumberOfTriggers', 0) + 1):
+        section = config[f'Trigger{i}']
+        triggers.append({
+            'index': i - 1,
+            'angle': section.getfloat('Angle', 0.0),
+            'ray': section.getboolean('Ray', False),
+            'gain': section.getfloat('Gain', 1.0),
+            'transpose': section.getfloat('Transpose', 0.0),
+        })
+    return triggers or [DEFAULT_TRIGGER]
+
+def read_audio_settings(file):
+    # The optional [Audio] section: Profile, SampleRate, BufferSize, Backend and Duplex, None where unset
+    config = configparser.ConfigParser()
+    config.read(file)
+    audio = config['Audio'] if 'Audio' in config else {}
+    sample_rate = audio.get('SampleRate')
+    buffer_size = audio.get('BufferSize')
+    duplex = audio.get('Duplex')
+    return {
+        'profile': audio.get('Profile') or None,
+        'sr': int(sample_rate) if sample_rate else None,
+        'buffersize': int(buffer_size) if buffer_size else None,
+        'audio': audio.get('Backend') or None,
+        'duplex': int(config['Audio'].getboolean('Duplex')) if duplex else None,
+    }
+
+def build_planets(scene, sustain_release_time, audio=None):
+    planets = []
+    built = []
+    for body in scene['bodies']:
+        if body['parent'] is None:
+            new_body = Planet(body['radius'], body['size'], body['frequency'], body['eccentricity'],
+                              body['orbit_angle'], sustain_release_time, body['sound_file'], audio)
+            if new_body.bus:
+                new_body.bus.set_mute(body['muted'])
+                new_body.bus.set_gain(body['gain'])
+            planets.append(new_body)
+        else:
+            parent = built[body['parent']]
+            new_body = Moon(parent, body['radius'], body['size'], body['frequency'], body['eccentricity'],
+                            body['orbit_angle'], sustain_release_time, body['sound_file'], audio)
+            parent.add_moon(new_body)
+        new_body.max_trigger_rate = scene['max_trigger_rate']
+        for line in scene['triggers']:
+            new_body.line_voice(line)  # so no pyo objects are made while playing
+        built.append(new_body)
+
+    for planet in planets:
+        planet.seek(0)  # Start with crossing state matching the start position
+    return planets
+
+def load_settings(file, sustain_release_time=SUSTAIN_RELEASE_TIME, audio=None):
+    scene = read_scene(file)
+    if scene['sustain_release_time'] is not None:
+        sustain_release_time = scene['sustain_release_time']
+    planets = build_planets(scene, sustain_release_time, audio)
+    return planets, scene['speed_multiplier'], sustain_release_time, scene['triggers']
+
+def update_settings_file(filename, planets, speed_multiplier, elliptical_orbits, sustain_release_time):
+    # Audio settings and trigger lines are not edited by the demos, so existing ones are kept as they are
+    previous = configparser.ConfigParser()
+    previous.read(filename)
+
+    config = configparser.ConfigParser()
+    config['Global'] = {
+        'NumberOfPlanets': str(len(planets)),
+        'SpeedMultiplier': str(speed_multiplier),
+        'EllipticalOrbits': str(elliptical_orbits).lower(),
+        'MaxEccentricity': '0.99',
+        'SelectedScale': 'C Major',
+        'SustainReleaseTime': str(sustain_release_time),
+        'MaxTriggerRate': str(planets[0].max_trigger_rate if planets else MAX_TRIGGER_RATE)
+    }
+
+    for i, planet in enumerate(planets, 1):
+        planet_section = f'Planet{i}'
+        config[planet_section] = {
+            'Size': str(planet.size),
+            'Frequency': str(planet.frequency),
+            'Distance': str(planet.radius),
+            'NumberOfMoons': str(len(planet.moons)),
+            'Eccentricity': f"{planet.eccentricity:.4f}",
+            'OrbitAngle': f"{planet.orbit_angle:.4f}",
+            'SoundFile': ''
+        }
+        if planet.bus:
+            config[planet_section]['Gain'] = f"{planet.bus.level:.2f}"
+            config[planet_section]['Mute'] = str(planet.bus.muted).lower()
+        write_moons(config, planet_section, planet)
+
+    if 'Audio' in previous:
+        config['Audio'] = previous['Audio']
+    if 'Global' in previous and 'NumberOfTriggers' in previous['Global']:
+        config['Global']['NumberOfTriggers'] = previous['Global']['NumberOfTriggers']
+        for section in previous.sections():
+            if section.startswith('Trigger'):
+                config[section] = previous[section]
+
+    with open(filename, 'w') as configfile:
+        config.write(configfile)
+
+def write_moons(config, section, parent):
+    for j, moon in enumerate(parent.moons, 1):
+        moon_section = f'{section}Moon{j}'
+        config[moon_section] = {
+            'Size': str(moon.size),
+            'Frequency': str(moon.frequency),
+            'Distance': str(moon.radius),
+            'Eccentricity': f"{moon.eccentricity:.4f}",
+            'OrbitAngle': f"{moon.orbit_angle:.4f}",
+            'SoundFile': ''
+        }
+        if moon.moons:
+            config[moon_section]['NumberOfMoons'] = str(len(moon.moons))
+        write_moons(config, moon_section, moon)
+
+def update_settings_ini(filename, speed_multiplier, sustain_release_time):
+    config = configparser.ConfigParser()
+    config.read(filename)
+
+    if 'Global' not in config:
+        config['Global'] = {}
+
+    config['Global']['SpeedMultiplier'] = str(speed_multiplier)
+    config['Global']['SustainReleaseTime'] = str(sustain_release_time)
+
+    with open(filename, 'w') as configfile:
+        config.write(configfile)
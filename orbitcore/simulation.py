@@ -0,0 +1,160 @@
+import threading
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+from .arrays import SceneArrays, scene_key
+from .constants import FRAME_RATE
+from .preload import SceneSwitcher
+
+# A worker this many ticks behind schedule skips ahead instead of replaying the backlog in a burst
+MAX_LAG_TICKS = 5
+
+class Simulation:
+    # Everything that moves with time: the playing scene, orbit time and scene switches.
+    # Callers changing planets or timing from another thread hold `lock`.
+    def __init__(self, scene, switcher=None):
+        self.scene = scene
+        self.speed_multiplier = scene.speed_multiplier
+        self.switcher = switcher if switcher else SceneSwitcher()
+        self.paused = False
+        self.orbit_time = 0  # Speed multiplier accumulated over played frames
+        self.frames = 0
+        self.switches = 0
+        self.lock = threading.RLock()
+
+    @property
+    def planets(self):
+        return self.scene.planets
+
+    def tick(self, now):
+        with self.lock:
+            if not self.paused:
+                self.scene.triggers.update(self.scene.planets, self.speed_multiplier)
+                self.orbit_time += self.speed_multiplier
+                self.frames += 1
+            if self.switcher.due(self.scene.planets):
+                self.scene.speed_multiplier = self.speed_multiplier
+                self.scene = self.switcher.switch(self.scene, now)
+                self.speed_multiplier = self.scene.speed_multiplier
+                self.orbit_time = 0
+                self.frames = 0
+                self.switches += 1
+            self.switcher.update(now)
+
+    def seek(self, seconds):
+        # Places every body where it would be after `seconds` of playback at the current speed
+        self.jump(int(seconds * FRAME_RATE), seconds * FRAME_RATE * self.speed_multiplier)
+
+    def jump(self, frames, orbit_time):
+        with self.lock:
+            self.orbit_time = orbit_time
+            self.frames = frames
+            for planet in self.scene.planets:
+                planet.seek(self.orbit_time)
+            self.scene.triggers.reset()
+
+class SharedPositions:
+    # Latest x, y and glow of every body in shared memory. The writer makes the sequence number
+    # odd while it writes, so a reader retries instead of seeing half of one frame and half of the next.
+    HEADER = 3  # sequence, body count, layout (which planets list the rows belong to)
+
+    def __init__(self, capacity=1024):
+        self.capacity = 0
+        self.shm = None
+        self.retired = []
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # A reader may still be copying out of the old block, so it is only released on close()
+        if self.shm is not None:
+            self.retired.append(self.shm)
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=(self.HEADER + 3 * capacity) * 8)
+        self.header = np.ndarray((self.HEADER,), dtype=np.int64, buffer=self.shm.buf)
+        self.rows = np.ndarray((3, capacity), dtype=np.float64, buffer=self.shm.buf, offset=self.HEADER * 8)
+        self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, x, y, glow, layout):
+        count = len(x)
+        if count > self.capacity:
+            self.allocate(max(count, 2 * self.capacity))
+        self.header[0] += 1
+        self.rows[0, :count] = x
+        self.rows[1, :count] = y
+        self.rows[2, :count] = glow
+        self.header[1] = count
+        self.header[2] = layout
+        self.header[0] += 1
+
+    def read(self):
+        while True:
+            header, rows = self.header, self.rows
+            sequence = int(header[0])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            count = int(header[1])
+            layout = int(header[2])
+            x, y, glow = rows[:, :count].copy()
+            if int(header[0]) == sequence and header is self.header:
+                return x, y, glow, layout
+
+    def close(self):
+        del self.header, self.rows
+        for shm in self.retired + [self.shm]:
+            shm.close()
+            shm.unlink()
+
+class SimulationWorker(threading.Thread):
+    # Ticks a Simulation at a fixed rate on its own thread, so triggers keep time however long
+    # a frame takes to draw, and publishes positions for the renderer after every tick
+    def __init__(self, simulation, rate=FRAME_RATE, capacity=1024):
+        super().__init__(daemon=True)
+        self.simulation = simulation
+        self.rate = rate
+        self.positions = SharedPositions(capacity)
+        self.arrays = None
+        self.tick_time = time.perf_counter()  # when the last tick was due
+        self.clock = None  # a sync.ClockFollower sets itself here to take over the schedule
+        self.stopped = threading.Event()
+
+    def run(self):
+        period = 1 / self.rate
+        next_tick = time.perf_counter()
+        while not self.stopped.is_set():
+            with self.simulation.lock:
+                self.tick_time = next_tick
+                self.simulation.tick(time.perf_counter() * 1000)
+            self.publish()
+
+            next_tick += period
+            if self.clock:
+                next_tick = self.clock.due(self.simulation.frames, next_tick)
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self.stopped.wait(delay)
+            elif delay < -MAX_LAG_TICKS * period:
+                next_tick = time.perf_counter()
+
+    def publish(self):
+        with self.simulation.lock:
+            planets = self.simulation.planets
+            if self.arrays is None or self.arrays.key != scene_key(planets):
+                self.arrays = SceneArrays(planets)
+            x, y = self.arrays.positions()
+            self.positions.write(x, y, self.arrays.glows(), id(planets))
+
+    def snapshot(self, planets):
+        # The latest (x, y, glow) if it belongs to `planets`, otherwise None
+        x, y, glow, layout = self.positions.read()
+        return (x, y, glow) if layout == id(planets) else None
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.positions.close()
@@ -0,0 +1,40 @@
+import contextlib
+import threading
+import time
+
+class StartupTimer:
+    # When each startup step began and ended and on which thread, so overlapping steps show up as such
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.steps = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def step(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, began, time.perf_counter())
+
+    def call(self, name, function, *args):
+        # For handing a timed step to an executor
+        with self.step(name):
+            return function(*args)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.add(name, now, now)
+
+    def add(self, name, began, ended):
+        with self.lock:
+            self.steps.append((name, threading.current_thread().name, began - self.started, ended - self.started))
+
+    def report(self):
+        lines = ["Startup (ms from launch):"]
+        for name, thread, began, ended in sorted(self.steps, key=lambda step: step[2]):
+            if ended > began:
+                lines.append(f"  {began * 1000:7.1f} to {ended * 1000:7.1f}  {(ended - began) * 1000:7.1f}  {name} [{thread}]")
+            else:
+                lines.append(f"  {began * 1000:7.1f}              {name}")
+        return '\n'.join(lines)
@@ -0,0 +1,142 @@
+import collections
+import json
+import logging
+import socket
+import threading
+import time
+
+from .simulation import MAX_LAG_TICKS
+
+log = logging.getLogger(__name__)
+
+SYNC_PORT = 47600
+# Seconds between a follower's clock requests
+SYNC_INTERVAL = 0.25
+# Replies kept; the one with the shortest round trip gives the clock offset
+SYNC_SAMPLES = 8
+# A follower further than this many ticks from the master jumps straight to its position
+MAX_PHASE_TICKS = 1.5
+# Ticks of orbit time a follower may differ from the master by; once locked only rounding error remains
+ORBIT_TOLERANCE = 0.01
+# Seconds between sync reports in the log
+REPORT_INTERVAL = 10.0
+
+def parse_address(text):
+    # "host:port" or "host"
+    host, _, port = text.partition(':')
+    return host or '127.0.0.1', int(port) if port else SYNC_PORT
+
+class ClockMaster(threading.Thread):
+    # Answers clock requests over UDP with this instance's playback position and when the
+    # SimulationWorker's last tick was due, on this machine's perf_counter clock
+    def __init__(self, worker, port=SYNC_PORT, host=''):
+        super().__init__(daemon=True)
+        self.worker = worker
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.settimeout(0.2)
+        self.stopped = threading.Event()
+
+    def state(self):
+        simulation = self.worker.simulation
+        with simulation.lock:
+            return {'frames': simulation.frames, 'orbit_time': simulation.orbit_time,
+                    'speed': simulation.speed_multiplier, 'paused': simulation.paused, 'due': self.worker.tick_time}
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                data, address = self.socket.recvfrom(1024)
+                request = json.loads(data)
+            except socket.timeout:
+                continue
+            except ValueError:
+                continue
+            except OSError:
+                break
+            reply = dict(self.state(), sent=request.get('sent'), time=time.perf_counter())
+            self.socket.sendto(json.dumps(reply).encode(), address)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.socket.close()
+
+class ClockFollower(threading.Thread):
+    # Locks a SimulationWorker to a ClockMaster: the worker ticks on the master's schedule, and
+    # jumps to the master's position whenever it is more than MAX_PHASE_TICKS away, e.g. on joining
+    def __init__(self, worker, address, interval=SYNC_INTERVAL):
+        super().__init__(daemon=True)
+        self.worker = worker
+        self.address = address
+        self.interval = interval
+        self.period = 1 / worker.rate
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.settimeout(interval)
+        self.samples = collections.deque(maxlen=SYNC_SAMPLES)
+        self.epoch = None  # when the master's frame 0 was due, on this machine's clock
+        self.offset = self.round_trip = self.phase_error = 0.0
+        self.jumps = 0
+        self.connected = None
+        self.stopped = threading.Event()
+        worker.clock = self
+
+    def due(self, frames, default):
+        # When the tick after `frames` is due on the master's schedule; `default` until the master
+        # has answered, while paused, or when the worker has fallen too far behind to catch up
+        if self.epoch is None or self.worker.simulation.paused:
+            return default
+        due = self.epoch + (frames + 1) * self.period
+        return due if due > time.perf_counter() - MAX_LAG_TICKS * self.period else default
+
+    def request(self):
+        sent = time.perf_counter()
+        self.socket.sendto(json.dumps({'sent': sent}).encode(), self.address)
+        while True:
+            reply = json.loads(self.socket.recvfrom(1024)[0])
+            if reply.get('sent') == sent:  # late answers to earlier requests are ignored
+                return reply, sent, time.perf_counter()
+
+    def update(self, reply, sent, received):
+        # NTP style: the master read its clock about halfway through the round trip
+        self.samples.append((received - sent, reply['time'] - (sent + received) / 2))
+        self.round_trip, self.offset = min(self.samples)
+        self.epoch = reply['due'] - self.offset - reply['frames'] * self.period
+
+        simulation = self.worker.simulation
+        with simulation.lock:
+            simulation.speed_multiplier = reply['speed']
+            simulation.paused = reply['paused']
+            frames = reply['frames']
+            if not simulation.paused:
+                frames = max(frames, int((time.perf_counter() - self.epoch) / self.period))
+            # Where the master's orbit time was or will be at our frame count, which also catches speed changes
+            expected = reply['orbit_time'] + (simulation.frames - reply['frames']) * reply['speed']
+            if (abs(simulation.frames - frames) > MAX_PHASE_TICKS
+                    or abs(simulation.orbit_time - expected) > ORBIT_TOLERANCE * reply['speed']):
+                simulation.jump(frames, reply['orbit_time'] + (frames - reply['frames']) * reply['speed'])
+                self.jumps += 1
+            self.phase_error = self.worker.tick_time - (self.epoch + simulation.frames * self.period)
+
+    def run(self):
+        reported = time.perf_counter()
+        while not self.stopped.is_set():
+            try:
+                self.update(*self.request())
+                if not self.connected:
+                    log.info("Following the clock at %s:%d", *self.address)
+                    self.connected = True
+            except (OSError, ValueError, KeyError) as e:
+                if self.connected is not False:
+                    log.warning("No clock from %s:%d: %s", *self.address, e or type(e).__name__)
+                self.connected = False
+            if time.perf_counter() - reported >= REPORT_INTERVAL:
+                reported = time.perf_counter()
+                log.info("Clock sync with %s:%d: offset %.3f ms, round trip %.3f ms, phase error %.3f ms, %d jumps",
+                         *self.address, self.offset * 1000, self.round_trip * 1000, self.phase_error * 1000, self.jumps)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.socket.close()
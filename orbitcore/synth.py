@@ -0,0 +1,102 @@
+import wave
+import numpy as np
+
+from .audio import LIMIT_CEILING
+from .bodies import trigger_gap
+from .constants import FRAME_RATE
+from .lines import transpose_ratio
+from .settings import SUSTAIN_RELEASE_TIME
+from .timeline import trigger_timeline
+
+# Offline rendering of a scene's trigger timeline with NumPy only, no pyo or audio device.
+# Every note of a body is the same sine and envelope, so each body's note is computed once and
+# added to the output at its start times, one large block of the output at a time.
+
+SAMPLE_RATE = 48000
+BLOCK_SECONDS = 10.0
+# Same as the Sine mul and Adsr attack of PyoVoice
+AMPLITUDE = 0.3
+ATTACK = 0.01
+
+def envelope(t, size, release):
+    # pyo's Adsr in dur mode as PyoVoice sets it up, at `t` seconds into the note: the note lasts
+    # size/10 s and the release starts that long before its end, from the sustain level
+    dur = size / 10
+    decay = size / 100
+    sustain = min(size / 200, release)
+    attack_part = t / ATTACK
+    decay_part = (decay - (t - ATTACK)) / decay * (1 - sustain) + sustain if decay > 0 else sustain
+    release_part = (1 - (t - (dur - release)) / release) * sustain if release > 0 else 0.0
+    return np.select([t <= ATTACK, t < ATTACK + decay, t < dur - release, t <= dur],
+                     [attack_part, decay_part, sustain, release_part], 0.0)
+
+def note_wave(frequency, size, release, sample_rate=SAMPLE_RATE):
+    # One note of a body; pyo's envelope reads its clock after each sample, hence the + 1
+    t = (np.arange(int(size / 10 * sample_rate)) + 1) / sample_rate
+    return AMPLITUDE * envelope(t, size, release) * np.sin(2 * np.pi * frequency * t)
+
+def limit_rate(times, body_indices, min_gap):
+    # Drops every crossing closer than `min_gap` frames (see bodies.trigger_gap) to the last one kept
+    # for the same body, like TriggerLines.update does live
+    keep = np.ones(len(times), dtype=bool)
+    last = {}
+    for i, (t, body) in enumerate(zip(times, body_indices)):
+        if t < last.get(body, -np.inf) + min_gap:
+            keep[i] = False
+        else:
+            last[body] = t
+    return keep
+
+def body_gains(bodies):
+    # Gain of each body's planet bus, 0 when muted
+    gains = []
+    for body in bodies:
+        root = body
+        while root['parent'] is not None:
+            root = bodies[root['parent']]
+        gains.append(0.0 if root['muted'] else root['gain'])
+    return np.array(gains)
+
+def render_scene(scene, filename, duration, sample_rate=SAMPLE_RATE, block_seconds=BLOCK_SECONDS,
+                 sustain_release_time=None):
+    # Writes `duration` seconds of `scene` (from settings.read_scene) to a 16 bit stereo WAV.
+    # Sound files are not read; those bodies play their frequency as a sine like any other.
+    bodies = scene['bodies']
+    release = sustain_release_time or scene['sustain_release_time'] or SUSTAIN_RELEASE_TIME
+    triggers = scene['triggers']
+    times, body_indices, line_indices, directions = trigger_timeline(bodies, scene['speed_multiplier'],
+                                                                     duration * FRAME_RATE, triggers)
+    keep = limit_rate(times, body_indices, trigger_gap(scene['max_trigger_rate']))
+    starts = np.round(times[keep] / FRAME_RATE * sample_rate).astype(np.int64)
+    # One note per body and trigger line, as every line may transpose and set its own gain
+    notes = body_indices[keep] * len(triggers) + line_indices[keep]
+
+    gains = body_gains(bodies)
+    waves = [note_wave(body['frequency'] * transpose_ratio(line), body['size'], release, sample_rate)
+             * gain * line['gain'] for body, gain in zip(bodies, gains) for line in triggers]
+    longest = max((len(w) for w in waves), default=0)
+
+    total = int(duration * sample_rate)
+    block = int(block_seconds * sample_rate)
+    peak = 0.0
+    clipped = 0
+    with wave.open(filename, 'wb') as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        for block_start in range(0, total, block):
+            block_end = min(block_start + block, total)
+            samples = np.zeros(block_end - block_start)
+            # Notes starting in this block, or early enough to still sound in it
+            first, last = np.searchsorted(starts, [block_start - longest, block_end])
+            for start, index in zip(starts[first:last], notes[first:last]):
+                note = waves[index]
+                lo, hi = max(start, block_start), min(start + len(note), block_end)
+                if lo < hi:
+                    samples[lo - block_start:hi - block_start] += note[lo - start:hi - start]
+            peak = max(peak, float(np.abs(samples).max(initial=0.0)))
+            clipped += int(np.count_nonzero(np.abs(samples) > LIMIT_CEILING))
+            pcm = (np.clip(samples, -LIMIT_CEILING, LIMIT_CEILING) * 32767).astype('<i2')
+            out.writeframes(np.repeat(pcm, 2).tobytes())
+
+    return {'notes': len(starts), 'peak': peak, 'clipped': clipped}
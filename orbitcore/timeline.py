@@ -0,0 +1,174 @@
+import csv
+import math
+import numpy as np
+
+from .lines import DEFAULT_TRIGGER, trigger_direction, trigger_normal
+
+# Crossing times of the body dicts from settings.read_scene, in frames from orbit time 0
+
+# Largest angle any body in a chain may turn between two samples of the root search
+MAX_STEP_ANGLE = math.pi / 8
+CHUNK_SAMPLES = 1 << 18
+BISECT_STEPS = 48
+
+def angular_velocity(body, speed_multiplier):
+    # Radians per frame, same as TriggerLines.update advances every body by
+    return speed_multiplier / body['radius']
+
+def revolution_frames(body, speed_multiplier):
+    return 2 * math.pi / angular_velocity(body, speed_multiplier)
+
+def orbit_offset(body, speed_multiplier, t):
+    angle = angular_velocity(body, speed_multiplier) * t
+    e = body['eccentricity']
+    r = body['radius'] * (1 - e**2) / (1 + e * np.cos(angle))
+    return r * np.cos(angle + body['orbit_angle']), r * np.sin(angle + body['orbit_angle'])
+
+def body_chain(bodies, index):
+    chain = []
+    while index is not None:
+        chain.append(bodies[index])
+        index = bodies[index]['parent']
+    return chain
+
+def chain_offset(chain, speed_multiplier, t):
+    # Offset from CENTER, without the int() pixel snapping of the demos
+    x = y = 0.0
+    for body in chain:
+        dx, dy = orbit_offset(body, speed_multiplier, t)
+        x = x + dx
+        y = y + dy
+    return x, y
+
+def line_offset(chain, speed_multiplier, t, line=DEFAULT_TRIGGER):
+    # Signed distance from a trigger line, for the default one the horizontal distance from CENTER
+    normal_x, normal_y = trigger_normal(line)
+    x, y = chain_offset(chain, speed_multiplier, t)
+    return x * normal_x + y * normal_y
+
+def body_crossings(bodies, index, speed_multiplier, duration, line=DEFAULT_TRIGGER):
+    chain = body_chain(bodies, index)
+    fastest = max(angular_velocity(body, speed_multiplier) for body in chain)
+    step = MAX_STEP_ANGLE / fastest
+    total_steps = int(math.ceil(duration / step))
+
+    times = []
+    directions = []
+    for start in range(0, total_steps, CHUNK_SAMPLES):
+        count = min(CHUNK_SAMPLES, total_steps - start)
+        t = np.minimum((start + np.arange(count + 1)) * step, duration)
+        x = line_offset(chain, speed_multiplier, t, line)
+        # Same edge rule as TriggerLines.crossings: landing exactly on the line counts once
+        rising = (x[:-1] < 0) & (x[1:] >= 0)
+        falling = (x[:-1] > 0) & (x[1:] <= 0)
+        hits = np.nonzero(rising | falling)[0]
+        if len(hits) == 0:
+            continue
+
+        lo = t[hits]
+        hi = t[hits + 1]
+        lo_sign = np.sign(x[hits])
+        for _ in range(BISECT_STEPS):
+            mid = (lo + hi) / 2
+            same = np.sign(line_offset(chain, speed_multiplier, mid, line)) == lo_sign
+            lo = np.where(same, mid, lo)
+            hi = np.where(same, hi, mid)
+
+        direction = np.where(rising[hits], 1, -1)
+        if line['ray']:
+            # Only crossings on the ray's side of CENTER count
+            along_x, along_y = trigger_direction(line)
+            x, y = chain_offset(chain, speed_multiplier, hi)
+            ahead = x * along_x + y * along_y > 0
+            hi, direction = hi[ahead], direction[ahead]
+        times.append(hi)
+        directions.append(direction)
+
+    if not times:
+        return np.zeros(0), np.zeros(0, dtype=int)
+    return np.concatenate(times), np.concatenate(directions)
+
+def trigger_timeline(bodies, speed_multiplier, duration, triggers=None):
+    # All crossings of every trigger line in [0, duration] frames, sorted by time, as times, body
+    # indices, line indices and directions
+    times = []
+    body_indices = []
+    line_indices = []
+    directions = []
+    for line_index, line in enumerate(triggers or [DEFAULT_TRIGGER]):
+        for index in range(len(bodies)):
+            t, d = body_crossings(bodies, index, speed_multiplier, duration, line)
+            times.append(t)
+            body_indices.append(np.full(len(t), index))
+            line_indices.append(np.full(len(t), line_index))
+            directions.append(d)
+
+    if not times:
+        return np.zeros(0), np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    times = np.concatenate(times)
+    body_indices = np.concatenate(body_indices)
+    line_indices = np.concatenate(line_indices)
+    directions = np.concatenate(directions)
+    order = np.argsort(times, kind='stable')
+    return times[order], body_indices[order], line_indices[order], directions[order]
+
+def scene_timeline(bodies, speed_multiplier, duration, triggers=None):
+    # All crossings in [0, duration] frames, sorted by time, whichever line they cross
+    times, body_indices, line_indices, directions = trigger_timeline(bodies, speed_multiplier, duration, triggers)
+    return times, body_indices, directions
+
+def cycle_length(bodies, speed_multiplier, tolerance, max_frames):
+    # Every angle is speed * t / radius, so the whole scene repeats after 2*pi*lcm(radii) / speed
+    radii = [body['radius'] for body in bodies]
+    exact = 2 * math.pi * math.lcm(*radii) / speed_multiplier
+    if exact <= max_frames:
+        return exact, 0.0, True
+
+    # No exact repeat in range: look for the earliest whole number of turns of the fastest
+    # body at which every other body is back within `tolerance` pixels of where it started
+    base = 2 * math.pi * min(radii) / speed_multiplier
+    ratios = min(radii) / np.array(radii, dtype=float)
+    radii = np.array(radii, dtype=float)
+    max_k = max(1, int(max_frames // base))
+
+    best_k, best_drift = 1, math.inf
+    for start in range(1, max_k + 1, 4096):
+        k = np.arange(start, min(start + 4096, max_k + 1), dtype=float)[:, None]
+        turns = k * ratios
+        drift = np.max(radii * 2 * math.pi * np.abs(turns - np.round(turns)), axis=1)
+        within = np.nonzero(drift <= tolerance)[0]
+        if len(within):
+            return k[within[0], 0] * base, float(drift[within[0]]), False
+        i = int(np.argmin(drift))
+        if drift[i] < best_drift:
+            best_k, best_drift = k[i, 0], float(drift[i])
+
+    return best_k * base, best_drift, False
+
+def event_density(times_ms, duration_ms, bin_ms):
+    bins = max(1, int(math.ceil(duration_ms / bin_ms)))
+    counts, _ = np.histogram(times_ms, bins=bins, range=(0, bins * bin_ms))
+    return counts
+
+def collision_peaks(times_ms, window_ms, limit):
+    # Number of triggers starting within `window_ms` of each event; keep the densest clusters
+    if len(times_ms) == 0:
+        return []
+    counts = np.searchsorted(times_ms, times_ms + window_ms, side='left') - np.arange(len(times_ms))
+    peaks = []
+    for i in np.argsort(-counts, kind='stable'):
+        if counts[i] < 2 or len(peaks) >= limit:
+            break
+        if any(abs(times_ms[i] - times_ms[j]) < window_ms for j, _ in peaks):
+            continue
+        peaks.append((i, int(counts[i])))
+    return peaks
+
+def export_timeline(filename, bodies, times_ms, body_indices, directions):
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['TimeMs', 'Body', 'Planet', 'Moon', 'Frequency', 'Size', 'Direction'])
+        for time_ms, index, direction in zip(times_ms, body_indices, directions):
+            body = bodies[index]
+            writer.writerow([f"{time_ms:.3f}", body['name'], body['planet'], body['moon'],
+                             body['frequency'], body['size'], int(direction)])
@@ -0,0 +1,96 @@
+import numpy as np
+import pygame
+
+from .arrays import SceneArrays, scene_key
+from .constants import BLUE, CENTER, WHITE
+
+# Positions kept per body, one per drawn frame
+TRAIL_LENGTH = 60
+# Brightness kept from one position to the next older one
+TRAIL_DECAY = 0.95
+# Small scenes draw each trail as this many polylines, each a step dimmer than the last
+TRAIL_BANDS = 6
+# Scenes with more bodies than this plot every stored position as a pixel in one array pass
+SPLAT_THRESHOLD = 200
+
+def add_trail_arguments(parser):
+    parser.add_argument('--trails', type=int, nargs='?', const=TRAIL_LENGTH, default=0, metavar='LENGTH',
+                        help=f"draw fading trails of LENGTH frames behind every body (default {TRAIL_LENGTH})")
+    parser.add_argument('--trail-decay', type=float, default=TRAIL_DECAY,
+                        help="brightness kept from one trail frame to the next older one")
+
+def trails_from_args(args):
+    return Trails(args.trails, args.trail_decay) if args.trails > 0 else None
+
+class Trails:
+    # The last `length` positions of every body in one preallocated ring buffer, in scene
+    # coordinates so zooming redraws them in place. Memory is length * bodies * 8 bytes, only
+    # allocated again when bodies are added or removed or another scene starts playing.
+    def __init__(self, length=TRAIL_LENGTH, decay=TRAIL_DECAY, bands=TRAIL_BANDS, splat_threshold=SPLAT_THRESHOLD):
+        self.length = length
+        self.decay = decay
+        self.bands = bands
+        self.splat_threshold = splat_threshold
+        self.arrays = None
+        self.buffer = None
+        self.head = 0
+        self.count = 0
+        # Brightness of each age, newest first
+        self.fade = decay ** np.arange(length)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def record(self, planets, snapshot=None):
+        # Stores this frame's positions, from a SimulationWorker snapshot when it lines up with the bodies
+        if self.arrays is None or self.arrays.key != scene_key(planets):
+            self.arrays = SceneArrays(planets)
+            self.buffer = np.zeros((self.length, len(self.arrays.bodies), 2), dtype=np.float32)
+            self.clear()
+        if snapshot is not None and len(snapshot[0]) == len(self.arrays.bodies):
+            x, y = snapshot[0], snapshot[1]
+        else:
+            x, y = self.arrays.positions()
+        self.buffer[self.head, :, 0] = x
+        self.buffer[self.head, :, 1] = y
+        self.head = (self.head + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+
+    def screen_points(self, zoom_level):
+        # (age, body, xy) in screen pixels, newest first
+        ages = (self.head - 1 - np.arange(self.count)) % self.length
+        points = (self.buffer[ages] - CENTER) * zoom_level + CENTER
+        return points.astype(np.int32)
+
+    def colours(self):
+        return np.where(self.arrays.is_moon[:, None], BLUE, WHITE)
+
+    def draw(self, surface, zoom_level):
+        if self.count < 2 or not self.arrays.bodies:
+            return
+        points = self.screen_points(zoom_level)
+        if len(self.arrays.bodies) > self.splat_threshold:
+            self.splat(surface, points)
+        else:
+            self.draw_lines(surface, points)
+
+    def draw_lines(self, surface, points):
+        # One polyline per band and body, dimmest first; each band shares its end point with the next
+        colours = self.colours()
+        edges = np.linspace(0, self.count - 1, min(self.bands, self.count - 1) + 1).round().astype(int)
+        for start, end in reversed(list(zip(edges[:-1], edges[1:]))):
+            band_colours = (colours * self.fade[(start + end) // 2]).astype(int).tolist()
+            for outline, colour in zip(points[start:end + 1].transpose(1, 0, 2).tolist(), band_colours):
+                pygame.draw.lines(surface, colour, False, outline, 1)
+
+    def splat(self, surface, points):
+        # Every stored position as a pixel, oldest first so newer, brighter ones end up on top
+        width, height = surface.get_size()
+        points = points[::-1].reshape(-1, 2)
+        brightness = np.repeat(self.fade[:self.count][::-1], len(self.arrays.bodies))
+        colours = np.tile(self.colours(), (self.count, 1)) * brightness[:, None]
+        inside = (points[:, 0] >= 0) & (points[:, 0] < width) & (points[:, 1] >= 0) & (points[:, 1] < height)
+        pixels = pygame.surfarray.pixels3d(surface)
+        pixels[points[inside, 0], points[inside, 1]] = colours[inside]
+        del pixels
@@ -0,0 +1,173 @@
+import math
+import numpy as np
+
+from .arrays import SceneArrays, scene_key
+from .bodies import trigger_gap
+from .lines import DEFAULT_TRIGGER, trigger_direction, trigger_normal
+
+# Largest angle any body in a chain may turn between two crossing tests within a tick
+MAX_STEP_ANGLE = math.pi / 8
+REFINE_STEPS = 12
+NO_CROSSINGS = ()
+
+class TriggerLines:
+    # Tests every body of a scene against every trigger line once per tick, all in one set of
+    # array operations. The angle, glow and rate limit of every body live in columns here, so a tick
+    # only calls into Python for the bodies that crossed a line.
+    def __init__(self, lines=None):
+        self.lines = lines if lines else [DEFAULT_TRIGGER]
+        normals = np.array([trigger_normal(line) for line in self.lines])
+        directions = np.array([trigger_direction(line) for line in self.lines])
+        self.normal_x, self.normal_y = normals[:, 0], normals[:, 1]
+        self.direction_x, self.direction_y = directions[:, 0], directions[:, 1]
+        self.ray = np.array([line['ray'] for line in self.lines])
+        self.arrays = None
+        self.last = None  # signed distance of every body from every line at the end of the last tick
+
+    def reset(self):
+        # After bodies have been moved rather than advanced, e.g. by Simulation.jump
+        if self.arrays is not None:
+            self.next_trigger[:] = 0
+        self.last = None
+
+    def adopt(self, planets):
+        # Takes the angle, glow and rate limit state of every body into columns; from then on the
+        # bodies' angle and glow read and write their row here
+        arrays = SceneArrays(planets)
+        bodies = arrays.bodies
+        self.angle = np.array([body.angle for body in bodies], dtype=float)
+        self.glow = np.array([body.glow for body in bodies], dtype=np.int64)
+        self.next_trigger = np.array([body.column[0].next_trigger[body.column[1]] if body.column else 0.0
+                                      for body in bodies], dtype=float)
+        self.step = np.zeros(len(bodies))
+        # Fastest turn of anything in each body's chain per unit of speed, which sets how finely
+        # that body is sampled
+        self.chain_inverse_radius = 1 / arrays.radius
+        for level in arrays.levels:
+            self.chain_inverse_radius[level] = np.maximum(self.chain_inverse_radius[level],
+                                                          self.chain_inverse_radius[arrays.parents[level]])
+        for i, body in enumerate(bodies):
+            body.column = (self, i)
+        self.arrays = arrays
+        self.last = None
+
+    def update(self, planets, speed_multiplier):
+        # Advances every body by one tick and fires the crossings it made on the way
+        if self.arrays is None or self.arrays.key != scene_key(planets):
+            self.adopt(planets)
+        bodies = self.arrays.bodies
+        if not bodies:
+            return
+        if self.last is None:
+            self.last = self.distances(*self.offsets(self.angle[:, None]))[:, :, 0]
+        self.step = speed_multiplier * (1 / self.arrays.radius)
+        np.mod(self.angle + self.step, 2 * math.pi, out=self.angle)
+        self.next_trigger -= 1
+
+        for i, hits in self.crossings(speed_multiplier).items():
+            body = bodies[i]
+            for offset, line in hits:
+                if offset >= self.next_trigger[i]:
+                    body.trigger(offset, line)
+                    self.next_trigger[i] = offset + trigger_gap(body.max_trigger_rate)
+                else:
+                    body.dropped_triggers += 1
+        np.maximum(self.glow - 10, 0, out=self.glow)
+
+    def relative(self, index, angle):
+        # Offset of bodies `index` from the body they orbit with the maths of relative_position,
+        # without pixel snapping
+        arrays = self.arrays
+        e = arrays.eccentricity[index]
+        r = arrays.radius[index] * (1 - e**2) / (1 + e * np.cos(angle))
+        return r * np.cos(angle + arrays.orbit_angle[index]), r * np.sin(angle + arrays.orbit_angle[index])
+
+    def offsets(self, angle):
+        # Offset from CENTER of every body, `angle` being (bodies, samples)
+        x, y = self.relative(slice(None), angle.T)
+        x, y = x.T, y.T
+        for level in self.arrays.levels:
+            x[level] += x[self.arrays.parents[level]]
+            y[level] += y[self.arrays.parents[level]]
+        return x, y
+
+    def chain_offsets(self, index, fraction):
+        # Offset from CENTER of bodies `index`, each at its own fraction of the last tick, or at
+        # several when `fraction` is (len(index), samples)
+        x = np.zeros(fraction.shape)
+        y = np.zeros(fraction.shape)
+        node = index.copy()
+        active = node >= 0
+        while active.any():
+            current = node[active]
+            angle, step = self.angle[current], self.step[current]
+            if fraction.ndim > 1:
+                angle, step = angle[:, None], step[:, None]
+            dx, dy = self.relative(current if fraction.ndim == 1 else current[:, None], angle - (1 - fraction[active]) * step)
+            x[active] += dx
+            y[active] += dy
+            node[active] = self.arrays.parents[current]
+            active = node >= 0
+        return x, y
+
+    def distances(self, x, y):
+        # (lines, bodies, samples) signed distances from each line
+        return self.normal_x[:, None, None] * x + self.normal_y[:, None, None] * y
+
+    def crossings(self, speed_multiplier):
+        # {body index: [(fraction of the tick, line)]} for the tick just advanced, sorted by time. Each
+        # body's tick is split finely enough that nothing in its chain turns more than MAX_STEP_ANGLE
+        # between tests, so fast inner moons cannot wrap past a crossing, and bodies with nothing
+        # fast in their chain are only tested where the tick ends. Counts are rounded up to powers
+        # of two so a scene is tested in a handful of groups however many speeds it has.
+        end = self.distances(*self.offsets(self.angle[:, None]))[:, :, 0]
+        needed = np.maximum(1, np.ceil(abs(speed_multiplier) * self.chain_inverse_radius / MAX_STEP_ANGLE))
+        substeps = 2 ** np.ceil(np.log2(needed)).astype(int)
+        found_lines, found_bodies, lo, hi, lo_negative = [], [], [], [], []
+        for count in np.unique(substeps).tolist():
+            index = np.nonzero(substeps == count)[0]
+            middle = self.distances(*self.middle_offsets(index, count))
+            samples = np.concatenate((self.last[:, index, None], middle, end[:, index, None]), axis=2)
+            # Same edge rule as before: landing exactly on a line counts once
+            before, after = samples[:, :, :-1], samples[:, :, 1:]
+            lines, bodies, k = np.nonzero(((before < 0) & (after >= 0)) | ((before > 0) & (after <= 0)))
+            found_lines.append(lines)
+            found_bodies.append(index[bodies])
+            lo.append(k / count)
+            hi.append((k + 1) / count)
+            lo_negative.append(before[lines, bodies, k] < 0)
+        self.last = end
+
+        lines, bodies = np.concatenate(found_lines), np.concatenate(found_bodies)
+        if not len(lines):
+            return {}
+        lo, hi, lo_negative = np.concatenate(lo), np.concatenate(hi), np.concatenate(lo_negative)
+        for _ in range(REFINE_STEPS):
+            mid = (lo + hi) / 2
+            x, y = self.chain_offsets(bodies, mid)
+            same = (self.normal_x[lines] * x + self.normal_y[lines] * y < 0) == lo_negative
+            lo = np.where(same, mid, lo)
+            hi = np.where(same, hi, mid)
+
+        if self.ray.any():
+            # A ray only counts crossings on its own side of CENTER
+            x, y = self.chain_offsets(bodies, hi)
+            ahead = self.direction_x[lines] * x + self.direction_y[lines] * y > 0
+            keep = ~self.ray[lines] | ahead
+            lines, bodies, hi = lines[keep], bodies[keep], hi[keep]
+
+        found = {}
+        order = np.lexsort((hi, bodies))
+        for i, offset, line in zip(bodies[order].tolist(), hi[order].tolist(), lines[order].tolist()):
+            found.setdefault(i, []).append((offset, self.lines[line]))
+        return found
+
+    def middle_offsets(self, index, count):
+        # Offsets of bodies `index` at the count - 1 tests inside the tick, (len(index), count - 1)
+        if count == 1:
+            none = np.zeros((len(index), 0))
+            return none, none
+        fractions = np.arange(1, count) / count
+        if len(index) == len(self.arrays.bodies):
+            return self.offsets(self.angle[:, None] - (1 - fractions) * self.step[:, None])
+        return self.chain_offsets(index, np.broadcast_to(fractions, (len(index), count - 1)))
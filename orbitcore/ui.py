@@ -0,0 +1,36 @@
+import pygame
+
+# Record button colours while idle and while recording
+RECORD_COLOURS = {
+    False: {'normal_bg': '#45494e', 'hovered_bg': '#35393e', 'active_bg': '#35393e'},
+    True: {'normal_bg': 'red', 'hovered_bg': 'darkred', 'active_bg': 'darkred'},
+}
+# Rendered texts kept before the oldest are dropped
+MAX_TEXTS = 256
+
+def set_record_colours(button, recording):
+    # Rebuilding a pygame_gui button is expensive, so only call this when the recording state changes
+    for name, colour in RECORD_COLOURS[recording].items():
+        button.colours[name] = pygame.Color(colour)
+    button.rebuild()
+
+class TextCache:
+    # Fonts and rendered text surfaces, so text that does not change is drawn with a single blit
+    def __init__(self, max_texts=MAX_TEXTS):
+        self.max_texts = max_texts
+        self.fonts = {}
+        self.texts = {}
+
+    def font(self, name, size):
+        key = (name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(name, size)
+        return self.fonts[key]
+
+    def render(self, text, size, color, name=None):
+        key = (text, size, tuple(color), name)
+        if key not in self.texts:
+            if len(self.texts) >= self.max_texts:
+                del self.texts[next(iter(self.texts))]
+            self.texts[key] = self.font(name, size).render(text, True, color)
+        return self.texts[key]
@@ -0,0 +1,39 @@
+import argparse
+import time
+
+from orbitcore.events import OscListener
+
+# Prints the OSC messages sent to a port, e.g. by demoinialpha.py --osc, with how early each
+# arrived before its timetag
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Listen for Polyorbit OSC crossings and report how early they arrive.")
+    parser.add_argument('port', type=int, nargs='?', default=9000)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--duration', type=float, help="seconds to listen (default: until Ctrl+C)")
+    parser.add_argument('--quiet', action='store_true', help="only print the summary")
+    args = parser.parse_args()
+
+    listener = OscListener(args.port, args.host)
+    listener.start()
+    print(f"Listening on {args.host}:{args.port}")
+    start = time.perf_counter()
+    shown = 0
+    try:
+        while args.duration is None or time.perf_counter() - start < args.duration:
+            time.sleep(0.05)
+            for timetag, arrival, address, values in listener.received[shown:]:
+                if not args.quiet:
+                    early = f"{(timetag - arrival) * 1000:7.2f} ms early" if timetag is not None else "immediate"
+                    print(f"{address} {' '.join(str(v) for v in values)}  ({early})")
+                shown += 1
+    except KeyboardInterrupt:
+        pass
+    listener.stop()
+
+    margins = sorted((timetag - arrival) * 1000 for timetag, arrival, _, _ in listener.received if timetag is not None)
+    if margins:
+        print(f"{len(listener.received)} messages, arrived {margins[0]:.2f} ms to {margins[-1]:.2f} ms "
+              f"(median {margins[len(margins) // 2]:.2f} ms) before their timetag, {sum(m < 0 for m in margins)} late")
+    else:
+        print(f"{len(listener.received)} messages")
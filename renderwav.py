@@ -0,0 +1,41 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from orbitcore.settings import read_scene
+from orbitcore.synth import SAMPLE_RATE, render_scene
+
+def render_file(file, out_dir, duration, sample_rate):
+    # Renders one settings file to out_dir/<name>.wav. Runs in a worker process.
+    output = os.path.join(out_dir, os.path.splitext(os.path.basename(file))[0] + '.wav')
+    start = time.perf_counter()
+    try:
+        stats = render_scene(read_scene(file), output, duration, sample_rate)
+    except Exception as e:
+        return {'file': file, 'error': str(e) or type(e).__name__}
+    return dict(stats, file=file, output=output, seconds=time.perf_counter() - start, error='')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render settings files to WAV with NumPy only, no audio device or pyo needed.")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--out-dir', default='.', help="where to write the WAVs (default: current directory)")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds to render")
+    parser.add_argument('--sample-rate', type=int, default=SAMPLE_RATE)
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(render_file, file, args.out_dir, args.duration, args.sample_rate)
+                   for file in args.files]
+        for future in futures:
+            result = future.result()
+            if result['error']:
+                print(f"{result['file']}: {result['error']}")
+                continue
+            clipped = f", {result['clipped']} samples clipped" if result['clipped'] else ""
+            print(f"{result['output']}: {result['notes']} notes, peak {result['peak']:.2f}{clipped}, "
+                  f"{args.duration / result['seconds']:.0f}x real time")
+    print(f"Rendered {len(args.files)} files in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,113 @@
+import argparse
+import csv
+import glob
+import math
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from orbitcore.constants import FRAME_MS, FRAME_RATE
+from orbitcore.scales import SCALES, pitch_class, scale_pitch_classes
+from orbitcore.settings import read_scene
+from orbitcore.timeline import collision_peaks, cycle_length, scene_timeline
+
+INDEX_FIELDS = ['Rank', 'File', 'Score', 'EventsPerSecond', 'PeakHits', 'CycleSeconds', 'ExactCycle',
+                'Scale', 'ScaleFit', 'BestScale', 'BestScaleFit', 'Error']
+
+def score_scene(file, duration=60.0, max_cycle=3600.0, tolerance=1.0, collision_ms=10.0,
+                target_density=4.0, max_hits=3, long_cycle=120.0):
+    # Rhythm metrics of one scene from its analytic timeline, no audio. Runs in a worker process.
+    try:
+        scene = read_scene(file)
+        bodies, speed_multiplier = scene['bodies'], scene['speed_multiplier']
+        if not bodies:
+            raise ValueError("no bodies")
+
+        cycle, drift, exact = cycle_length(bodies, speed_multiplier, tolerance, max_cycle * FRAME_RATE)
+        window = min(duration * FRAME_RATE, cycle)
+        times, body_indices, directions = scene_timeline(bodies, speed_multiplier, window, scene['triggers'])
+        times_ms = times * FRAME_MS
+        seconds = window / FRAME_RATE
+        events_per_second = len(times) / seconds if seconds > 0 else 0.0
+        peaks = collision_peaks(times_ms, collision_ms, 1)
+        peak_hits = peaks[0][1] if peaks else 1 if len(times) else 0
+
+        # Share of the notes actually played that fall in each scale
+        classes = np.array([pitch_class(body['frequency']) for body in bodies])
+        histogram = np.bincount(classes[body_indices], minlength=12) if len(times) else np.zeros(12)
+        total = max(histogram.sum(), 1)
+        fits = {scale: histogram[sorted(scale_pitch_classes(scale))].sum() / total for scale in SCALES}
+        best_scale = max(fits, key=fits.get)
+        scale = scene['selected_scale'] if scene['selected_scale'] in SCALES else best_scale
+
+        # 1 for a scene that moves at about target_density notes a second, never stacks more than
+        # max_hits notes at once, loops exactly within long_cycle seconds and stays in its scale
+        density = math.exp(-math.log(max(events_per_second, 1e-3) / target_density) ** 2 / 2)
+        collisions = 1 / (1 + max(0, peak_hits - max_hits) / max_hits)
+        cycle_seconds = cycle / FRAME_RATE
+        looping = (1.0 if exact else 0.5) * min(1.0, long_cycle / cycle_seconds)
+        score = density * collisions * looping * fits[scale]
+
+        return {
+            'File': file,
+            'Score': f"{score:.4f}",
+            'EventsPerSecond': f"{events_per_second:.2f}",
+            'PeakHits': peak_hits,
+            'CycleSeconds': f"{cycle_seconds:.2f}",
+            'ExactCycle': str(exact).lower(),
+            'Scale': scale,
+            'ScaleFit': f"{fits[scale]:.3f}",
+            'BestScale': best_scale,
+            'BestScaleFit': f"{fits[best_scale]:.3f}",
+            'Error': '',
+        }
+    except Exception as e:
+        return {'File': file, 'Score': f"{0:.4f}", 'Error': str(e) or type(e).__name__}
+
+def score_corpus(files, workers=None, **options):
+    # Scores every file across a pool of processes and returns the rows best first
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(score_scene, file, **options) for file in files]
+        rows = [future.result() for future in futures]
+    rows.sort(key=lambda row: (row['Error'] != '', -float(row['Score']), row['File']))
+    for rank, row in enumerate(rows, 1):
+        row['Rank'] = rank
+    return rows
+
+def write_index(filename, rows):
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=INDEX_FIELDS, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a directory of Polyorbit settings files and write a ranked index.")
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--index', help="ranked CSV to write (default: scores.csv in the directory)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of each scene to analyse")
+    parser.add_argument('--max-cycle', type=float, default=3600.0, help="longest cycle to search for, in seconds")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="pixel drift accepted as a near-repeat")
+    parser.add_argument('--collision-ms', type=float, default=10.0, help="window for counting simultaneous notes")
+    parser.add_argument('--target-density', type=float, default=4.0, help="notes per second that score best")
+    parser.add_argument('--max-hits', type=int, default=3, help="simultaneous notes allowed before the score drops")
+    parser.add_argument('--long-cycle', type=float, default=120.0, help="cycles longer than this many seconds score lower")
+    parser.add_argument('--top', type=int, default=10, help="number of scenes to list")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.directory, '*.ini')))
+    if not files:
+        parser.exit(1, f"No .ini files in {args.directory}\n")
+    rows = score_corpus(files, args.workers, duration=args.duration, max_cycle=args.max_cycle,
+                        tolerance=args.tolerance, collision_ms=args.collision_ms,
+                        target_density=args.target_density, max_hits=args.max_hits, long_cycle=args.long_cycle)
+    index = args.index or os.path.join(args.directory, 'scores.csv')
+    write_index(index, rows)
+
+    print(f"Scored {len(files)} scenes, index written to {index}")
+    for row in rows[:args.top]:
+        if row['Error']:
+            print(f"  {row['Rank']:>3}. {row['File']}: {row['Error']}")
+        else:
+            print(f"  {row['Rank']:>3}. {row['File']}  score {row['Score']}, {row['EventsPerSecond']} notes/s, "
+                  f"peak {row['PeakHits']} hits, cycle {row['CycleSeconds']} s, {row['Scale']} fit {row['ScaleFit']}")
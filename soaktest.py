@@ -0,0 +1,184 @@
+import argparse
+import csv
+import time
+import numpy as np
+
+from orbitcore.constants import FRAME_RATE
+from orbitcore.preload import load_scene
+from orbitcore.settings import read_scene
+from orbitcore.simulation import Simulation, SimulationWorker
+from orbitcore.timeline import trigger_timeline
+from orbitcore.triggers import TriggerLines
+
+# Simulated seconds between progress lines
+PROGRESS_INTERVAL = 3600
+
+class RecordingTriggers(TriggerLines):
+    # Trigger lines that note every crossing they find, before the bodies' rate limits, as
+    # (frame time, wall clock time, body index, line index)
+    def __init__(self, simulation, lines, clock=None):
+        super().__init__(lines)
+        self.simulation = simulation
+        self.clock = clock  # when the tick being simulated was due, for wall clock times
+        self.started = None
+        self.found = []
+
+    def crossings(self, speed_multiplier):
+        found = super().crossings(speed_multiplier)
+        frames = self.simulation.frames  # counted up after the tick, so this is where it started
+        if self.started is None:
+            self.started = (self.clock() if self.clock else time.perf_counter()) - frames / FRAME_RATE
+        now = time.perf_counter()
+        for index, hits in found.items():
+            for offset, line in hits:
+                self.found.append((frames + offset, now + offset / FRAME_RATE - self.started, index, line['index']))
+        return found
+
+def soak(file, duration, realtime=False):
+    # Plays `file` without audio for `duration` seconds of scene time and returns the scene from
+    # read_scene, the recorded crossings and the trigger lines' bodies. Flat out unless `realtime`,
+    # which runs a SimulationWorker on the wall clock so frame pacing shows up in the times.
+    scene = load_scene(file)
+    sim = Simulation(scene)
+    worker = SimulationWorker(sim) if realtime else None
+    scene.triggers = RecordingTriggers(sim, scene.triggers.lines, (lambda: worker.tick_time) if worker else None)
+    ticks = int(duration * FRAME_RATE)
+
+    started = time.perf_counter()
+    if worker:
+        worker.start()
+        shown = 0
+        while sim.frames < ticks:
+            time.sleep(min(1.0, (ticks - sim.frames) / FRAME_RATE))
+            if sim.frames // (PROGRESS_INTERVAL * FRAME_RATE) > shown:
+                shown = sim.frames // (PROGRESS_INTERVAL * FRAME_RATE)
+                print(f"  {format_duration(sim.frames / FRAME_RATE)} played")
+        worker.stop()
+    else:
+        for tick in range(ticks):
+            sim.tick(tick * 1000 / FRAME_RATE)
+            if tick and tick % (PROGRESS_INTERVAL * FRAME_RATE) == 0:
+                print(f"  {format_duration(tick / FRAME_RATE)} simulated in {time.perf_counter() - started:.0f} s")
+    print(f"Played {format_duration(ticks / FRAME_RATE)} in {time.perf_counter() - started:.1f} s")
+
+    bodies = scene.triggers.arrays.bodies if scene.triggers.arrays else []
+    # A worker may have gone a tick or two past the end
+    found = [crossing for crossing in scene.triggers.found if crossing[0] <= ticks]
+    return read_scene(file), found, bodies, ticks
+
+def match(expected, found, tolerance):
+    # Pairs each found time with the nearest expected one within `tolerance`. Returns the error of
+    # every pair (found minus expected), the expected times they belong to, the number of expected
+    # crossings nothing was found for and the number found in excess: doubles, and grazing crossings
+    # the timeline's coarser sampling stepped over.
+    if not len(expected):
+        return np.zeros(0), np.zeros(0), 0, len(found)
+    right = np.searchsorted(expected, found)
+    left = np.maximum(right - 1, 0)
+    right = np.minimum(right, len(expected) - 1)
+    nearest = np.where(np.abs(found - expected[left]) <= np.abs(found - expected[right]), left, right)
+    error = found - expected[nearest]
+    close = np.abs(error) <= tolerance
+
+    # Only the closest of several found crossings counts as the match, the rest are doubles
+    order = np.lexsort((np.abs(error), nearest))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = nearest[order][1:] != nearest[order][:-1]
+    matched = np.zeros(len(found), dtype=bool)
+    matched[order] = first & close[order]
+    missed = len(expected) - np.count_nonzero(matched)
+    return error[matched], expected[nearest[matched]], missed, len(found) - np.count_nonzero(matched)
+
+def drift(times, errors):
+    # How far the error moved from the first crossing to the last, along a straight line fitted
+    # through all of them, so one late trigger does not count as drift
+    if len(times) < 2 or np.ptp(times) == 0:
+        return 0.0
+    return np.polyfit(times, errors, 1)[0] * np.ptp(times)
+
+def report(scene, found, bodies, ticks, tolerance_ms, realtime=False):
+    # One row per body and trigger line: expected and found crossings, missed, extra, bodies'
+    # rate limit drops, mean error, drift and error percentiles in ms
+    times, body_indices, line_indices, directions = trigger_timeline(scene['bodies'], scene['speed_multiplier'], ticks, scene['triggers'])
+    keep = times > 1e-9  # a body starting on a line has not crossed it
+    times, body_indices, line_indices = times[keep], body_indices[keep], line_indices[keep]
+
+    found = np.array(found, dtype=float).reshape(-1, 4)
+    found_times = found[:, 1] * 1000 if realtime else found[:, 0] * 1000 / FRAME_RATE
+    found_bodies = found[:, 2].astype(int)
+    found_lines = found[:, 3].astype(int)
+    dropped = [body.dropped_triggers for body in bodies] if len(bodies) == len(scene['bodies']) else [0] * len(scene['bodies'])
+
+    rows = []
+    all_errors = []
+    for line_index in range(len(scene['triggers'])):
+        for index in range(len(scene['bodies'])):
+            expected = times[(body_indices == index) & (line_indices == line_index)] * 1000 / FRAME_RATE
+            at = np.sort(found_times[(found_bodies == index) & (found_lines == line_index)])
+            errors, matched_times, missed, extra = match(expected, at, tolerance_ms)
+            all_errors.append(errors)
+            absolute = np.abs(errors)
+            percentiles = np.percentile(absolute, [50, 95, 99]) if len(errors) else [0.0] * 3
+            rows.append({
+                'body': index + 1,
+                'line': line_index + 1,
+                'expected': len(expected),
+                'found': len(at),
+                'missed': missed,
+                'extra': extra,
+                'rate_limited': dropped[index] if line_index == 0 else '',
+                'mean_ms': errors.mean() if len(errors) else 0.0,
+                'drift_ms': drift(matched_times, errors),
+                'p50_ms': percentiles[0],
+                'p95_ms': percentiles[1],
+                'p99_ms': percentiles[2],
+                'max_ms': absolute.max() if len(errors) else 0.0,
+            })
+    return rows, np.concatenate(all_errors) if all_errors else np.zeros(0)
+
+def format_duration(seconds):
+    hours, seconds = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a scene headlessly for a long time and compare every trigger with the exact crossing times.")
+    parser.add_argument('file', nargs='?', default='settings.ini')
+    parser.add_argument('--duration', type=float, default=3600.0, help="seconds of playback to simulate")
+    parser.add_argument('--realtime', action='store_true',
+                        help="tick on the wall clock like the demos do, so frame pacing counts (takes --duration seconds)")
+    parser.add_argument('--tolerance-ms', type=float, default=50.0, help="furthest a trigger may be from its crossing and still match it")
+    parser.add_argument('--top', type=int, default=10, help="number of bodies with the largest errors to list")
+    parser.add_argument('--csv', help="write every body's row to this CSV file")
+    args = parser.parse_args()
+
+    print(f"Soaking {args.file} for {format_duration(args.duration)}" + (" on the wall clock" if args.realtime else ""))
+    scene, found, bodies, ticks = soak(args.file, args.duration, args.realtime)
+    rows, errors = report(scene, found, bodies, ticks, args.tolerance_ms, args.realtime)
+
+    expected = sum(row['expected'] for row in rows)
+    missed = sum(row['missed'] for row in rows)
+    extra = sum(row['extra'] for row in rows)
+    limited = sum(row['rate_limited'] or 0 for row in rows)
+    print(f"Crossings: {expected} expected, {len(found)} found, {missed} missed, {extra} extra, "
+          f"{limited} dropped by MaxTriggerRate")
+    if len(errors):
+        p50, p95, p99 = np.percentile(np.abs(errors), [50, 95, 99])
+        print(f"Error: mean {errors.mean():+.3f} ms, |error| p50 {p50:.3f} ms, p95 {p95:.3f} ms, p99 {p99:.3f} ms, "
+              f"max {np.abs(errors).max():.3f} ms")
+        print(f"Drift: worst {max((row['drift_ms'] for row in rows), key=abs):+.4f} ms over the run")
+
+    print("\nBodies with the largest errors:")
+    print(f"{'body':>4} {'line':>4} {'expected':>8} {'missed':>6} {'extra':>6} {'mean ms':>8} {'drift ms':>8} "
+          f"{'p95 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    worst = sorted(rows, key=lambda row: (row['missed'] + row['extra'], row['max_ms']), reverse=True)[:args.top]
+    for row in worst:
+        print(f"{row['body']:>4} {row['line']:>4} {row['expected']:>8} {row['missed']:>6} {row['extra']:>6} "
+              f"{row['mean_ms']:>+8.3f} {row['drift_ms']:>+8.4f} {row['p95_ms']:>7.3f} {row['p99_ms']:>7.3f} {row['max_ms']:>7.3f}")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {len(rows)} rows to {args.csv}")